@@ -0,0 +1,55 @@
+"""objobssap ingest
+
+Revision ID: 3b9d2f4c81a6
+Revises: 67f1c0e72147
+Create Date: 2026-10-19 09:12:44.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9d2f4c81a6'
+down_revision: Union[str, None] = '67f1c0e72147'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The tables are created from the models on import, so only add what an older database is missing.
+    inspector = sa.inspect(op.get_bind())
+
+    unique_constraints = {uc["name"] for uc in inspector.get_unique_constraints("objobssap")}
+    if "uq_objobssap_window" not in unique_constraints:
+        # Keep the most recently inserted row of any duplicated window
+        op.execute(
+            """
+            DELETE FROM objobssap a USING objobssap b
+            WHERE a.target_name = b.target_name AND a.facility = b.facility
+              AND a.t_start = b.t_start AND a.t_stop = b.t_stop AND a.id < b.id
+            """
+        )
+        op.create_unique_constraint(
+            "uq_objobssap_window", "objobssap", ["target_name", "facility", "t_start", "t_stop"]
+        )
+
+    indexes = {index["name"] for index in inspector.get_indexes("objobssap")}
+    if "ix_objobssap_t_validity" not in indexes:
+        op.create_index("ix_objobssap_t_validity", "objobssap", ["t_validity"])
+
+    if not inspector.has_table("objobssap_data_version"):
+        op.create_table(
+            "objobssap_data_version",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("version", sa.Integer(), nullable=False, comment="Incremented on every ingest or prune"),
+            sa.PrimaryKeyConstraint("id"),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("objobssap_data_version")
+    op.drop_index("ix_objobssap_t_validity", table_name="objobssap")
+    op.drop_constraint("uq_objobssap_window", "objobssap", type_="unique")
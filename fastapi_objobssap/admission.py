@@ -0,0 +1,138 @@
+"""Admission control for the ObjObsSAP service.
+
+Bounds the number of queries a worker runs at once, so that together the workers stay within the database's
+connections. Queries beyond the limit wait in a bounded queue for a limited time, and are otherwise rejected
+straight away with a 503, so an overloaded service sheds load instead of slowing every request down.
+
+Heavy queries, those with a large MAXREC or no TIME constraint, additionally share a smaller limit.
+"""
+
+import asyncio
+
+from fastapi_objobssap.config.settings import get_settings
+from fastapi_objobssap.exceptions import ServiceOverloadedError
+from fastapi_objobssap.schemas import TimeParameter
+
+settings = get_settings()
+
+
+class AdmissionController:
+    """Bounded concurrency and queueing for the queries of a single worker."""
+
+    def __init__(self, max_concurrent: int, max_heavy: int, max_queue: int, queue_timeout: float, retry_after: int):
+        self.max_concurrent = max_concurrent
+        self.max_heavy = max_heavy
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+
+        self.slots = asyncio.Semaphore(max_concurrent)
+        self.heavy_slots = asyncio.Semaphore(max_heavy)
+
+        # Metrics
+        self.queued = 0
+        self.in_flight = 0
+        self.heavy_in_flight = 0
+        self.admitted = 0
+        self.rejected = {"queue_full": 0, "queue_timeout": 0}
+
+    def semaphores(self, heavy: bool) -> list[asyncio.Semaphore]:
+        """Return the semaphores a query takes, heavy slots first so heavy queries do not hold general ones."""
+        return [self.heavy_slots, self.slots] if heavy else [self.slots]
+
+    def reject(self, reason: str):
+        """Count a rejection and raise the error returned to the client."""
+        self.rejected[reason] += 1
+        raise ServiceOverloadedError("The service is overloaded, please retry later.", self.retry_after)
+
+    async def acquire(self, heavy: bool = False):
+        """Wait for a slot to run a query, raising ServiceOverloadedError if the query is shed."""
+
+        semaphores = self.semaphores(heavy)
+
+        if any(semaphore.locked() for semaphore in semaphores):
+            if self.queued >= self.max_queue:
+                self.reject("queue_full")
+
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.queue_timeout
+            acquired = []
+
+            self.queued += 1
+            try:
+                for semaphore in semaphores:
+                    await asyncio.wait_for(semaphore.acquire(), timeout=max(0.0, deadline - loop.time()))
+                    acquired.append(semaphore)
+            except asyncio.TimeoutError:
+                for semaphore in acquired:
+                    semaphore.release()
+                self.reject("queue_timeout")
+            except BaseException:
+                for semaphore in acquired:
+                    semaphore.release()
+                raise
+            finally:
+                self.queued -= 1
+        else:
+            # Free slots are taken without suspending
+            for semaphore in semaphores:
+                await semaphore.acquire()
+
+        self.admitted += 1
+        self.in_flight += 1
+        if heavy:
+            self.heavy_in_flight += 1
+
+    def release(self, heavy: bool = False):
+        """Release the slot of a finished query."""
+
+        for semaphore in self.semaphores(heavy):
+            semaphore.release()
+
+        self.in_flight -= 1
+        if heavy:
+            self.heavy_in_flight -= 1
+
+    def metrics(self) -> str:
+        """Return the admission metrics in the Prometheus text format."""
+
+        lines = [
+            "# HELP objobssap_admission_limit Queries a worker runs at once.",
+            "# TYPE objobssap_admission_limit gauge",
+            f'objobssap_admission_limit{{class="all"}} {self.max_concurrent}',
+            f'objobssap_admission_limit{{class="heavy"}} {self.max_heavy}',
+            "# HELP objobssap_admission_in_flight Queries currently running.",
+            "# TYPE objobssap_admission_in_flight gauge",
+            f'objobssap_admission_in_flight{{class="all"}} {self.in_flight}',
+            f'objobssap_admission_in_flight{{class="heavy"}} {self.heavy_in_flight}',
+            "# HELP objobssap_admission_queue_depth Queries waiting for a slot.",
+            "# TYPE objobssap_admission_queue_depth gauge",
+            f"objobssap_admission_queue_depth {self.queued}",
+            "# HELP objobssap_admission_admitted_total Queries admitted.",
+            "# TYPE objobssap_admission_admitted_total counter",
+            f"objobssap_admission_admitted_total {self.admitted}",
+            "# HELP objobssap_admission_rejected_total Queries rejected, by reason.",
+            "# TYPE objobssap_admission_rejected_total counter",
+        ]
+        for reason, count in self.rejected.items():
+            lines.append(f'objobssap_admission_rejected_total{{reason="{reason}"}} {count}')
+
+        return "\n".join(lines) + "\n"
+
+
+def is_heavy_query(time: TimeParameter, maxrec: int) -> bool:
+    """Whether a query gets the smaller heavy limit: a large MAXREC or no TIME constraint."""
+    return time is None or maxrec > settings.ADMISSION_HEAVY_MAXREC
+
+
+admission_controller = (
+    AdmissionController(
+        max_concurrent=settings.ADMISSION_MAX_CONCURRENT,
+        max_heavy=min(settings.ADMISSION_MAX_HEAVY, settings.ADMISSION_MAX_CONCURRENT),
+        max_queue=settings.ADMISSION_MAX_QUEUE,
+        queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+        retry_after=settings.ADMISSION_RETRY_AFTER,
+    )
+    if settings.ADMISSION_MAX_CONCURRENT > 0
+    else None
+)
@@ -0,0 +1,248 @@
+"""On-the-fly observability calculator for the ObjObsSAP service.
+
+Computes daily observability windows for a batch of positions over a regular time grid, filling the same columns as
+the ObjObsSAPModel. The Sun and Moon positions and the local sidereal time only depend on the grid, so they are
+computed once per day and cached across targets, and queries for overlapping ranges share the days they have in
+common.
+
+The geometry is kept simple: apparent (GCRS) Sun and Moon directions are compared with ICRS target directions,
+and elevations ignore refraction and precession.
+
+The apparent sidereal time and body positions need IERS Earth orientation data. Unless
+CALCULATOR_IERS_AUTO_DOWNLOAD is set, astropy never downloads it during a request and extrapolates the bundled
+tables instead, which is far below the accuracy of the time grid.
+"""
+
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import NamedTuple
+
+import astropy.units as u
+import numpy as np
+from astropy.coordinates import EarthLocation, get_body
+from astropy.time import Time
+from astropy.utils import iers
+
+from fastapi_objobssap.config.settings import get_settings
+
+settings = get_settings()
+
+if not settings.CALCULATOR_IERS_AUTO_DOWNLOAD:
+    iers.conf.auto_download = False
+    iers.conf.auto_max_age = None
+
+SECONDS_PER_DAY = 86400
+
+# Software identifier recorded in validity_predictor
+PREDICTOR_NAME = "fastapi_objobssap.calculator"
+
+
+class Ephemeris(NamedTuple):
+    """Sun and Moon directions and local sidereal time over a time grid of whole days."""
+
+    days: np.ndarray  # (D,) MJD of each day in the grid
+    samples_per_day: int
+    sun: np.ndarray  # (3, D * samples_per_day) unit vectors
+    moon: np.ndarray  # (3, D * samples_per_day) unit vectors
+    local_sidereal_time: np.ndarray  # (D * samples_per_day,) radians
+
+
+class DayEphemeris(NamedTuple):
+    """Sun and Moon directions and local sidereal time over a single day."""
+
+    sun: np.ndarray  # (3, samples_per_day) unit vectors
+    moon: np.ndarray  # (3, samples_per_day) unit vectors
+    local_sidereal_time: np.ndarray  # (samples_per_day,) radians
+
+
+class LRUCache:
+    """Thread-safe least recently used cache."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value of a key, or None."""
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        """Cache a value, evicting the least recently used entries beyond maxsize."""
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+
+# Daily ephemerides, keyed on (day, step)
+ephemeris_cache = LRUCache(settings.CALCULATOR_EPHEMERIS_CACHE_SIZE)
+
+
+def unit_vectors(ra: np.ndarray, dec: np.ndarray) -> np.ndarray:
+    """Convert RA and Dec in radians to an array of unit vectors with shape (3, n)."""
+    cos_dec = np.cos(dec)
+    return np.stack([cos_dec * np.cos(ra), cos_dec * np.sin(ra), np.sin(dec)])
+
+
+@lru_cache
+def facility_location() -> EarthLocation:
+    """Return the location of the calculator facility."""
+    return EarthLocation.from_geodetic(
+        lon=settings.CALCULATOR_LONGITUDE * u.deg,
+        lat=settings.CALCULATOR_LATITUDE * u.deg,
+        height=settings.CALCULATOR_HEIGHT * u.m,
+    )
+
+
+def compute_days(start: int, end: int, step: int) -> list[DayEphemeris]:
+    """Compute the ephemeris of each day in [start, end) every step seconds, in a single pass over the grid."""
+
+    location = facility_location()
+    samples_per_day = SECONDS_PER_DAY // step
+
+    offsets = np.arange((end - start) * samples_per_day) * (step / SECONDS_PER_DAY)
+    times = Time(start + offsets, format="mjd", scale="utc", location=location)
+
+    sun = get_body("sun", times, location)
+    moon = get_body("moon", times, location)
+
+    sun_vectors = unit_vectors(sun.ra.radian, sun.dec.radian)
+    moon_vectors = unit_vectors(moon.ra.radian, moon.dec.radian)
+    local_sidereal_time = times.sidereal_time("apparent").radian
+
+    days = []
+    for index in range(end - start):
+        samples = slice(index * samples_per_day, (index + 1) * samples_per_day)
+        days.append(DayEphemeris(sun_vectors[:, samples], moon_vectors[:, samples], local_sidereal_time[samples]))
+
+    return days
+
+
+def compute_ephemeris(start: int, end: int, step: int) -> Ephemeris:
+    """Return the Sun and Moon directions and local sidereal time for the days [start, end) every step seconds.
+
+    Days are taken from the ephemeris cache where possible, each run of missing days is computed in one pass.
+    """
+
+    days = {day: ephemeris_cache.get((day, step)) for day in range(start, end)}
+
+    day = start
+    while day < end:
+        if days[day] is not None:
+            day += 1
+            continue
+
+        run_end = day
+        while run_end < end and days[run_end] is None:
+            run_end += 1
+
+        for offset, ephemeris in enumerate(compute_days(day, run_end, step)):
+            days[day + offset] = ephemeris
+            ephemeris_cache.put((day + offset, step), ephemeris)
+
+        day = run_end
+
+    ordered = [days[day] for day in range(start, end)]
+
+    return Ephemeris(
+        days=np.arange(start, end),
+        samples_per_day=SECONDS_PER_DAY // step,
+        sun=np.concatenate([ephemeris.sun for ephemeris in ordered], axis=1),
+        moon=np.concatenate([ephemeris.moon for ephemeris in ordered], axis=1),
+        local_sidereal_time=np.concatenate([ephemeris.local_sidereal_time for ephemeris in ordered]),
+    )
+
+
+def compute_observability(ra, dec, start: int, end: int) -> list[dict]:
+    """Compute the daily observability windows of a batch of positions for the days [start, end).
+
+    A sample is observable when the target is above CALCULATOR_MIN_ELEVATION and further than the minimum
+    separations from the Sun and Moon. One row is returned per target and day with any observable time, with the
+    columns of the ObjObsSAPModel in order. The id and the columns the calculator does not compute are None.
+    """
+
+    step = settings.CALCULATOR_TIME_STEP
+    if SECONDS_PER_DAY % step:
+        raise ValueError(f"CALCULATOR_TIME_STEP must divide {SECONDS_PER_DAY}, got {step}")
+
+    ra = np.atleast_1d(np.asarray(ra, dtype=float))
+    dec = np.atleast_1d(np.asarray(dec, dtype=float))
+
+    if end <= start or not len(ra):
+        return []
+
+    ephemeris = compute_ephemeris(start, end, step)
+
+    ra_rad = np.radians(ra)
+    dec_rad = np.radians(dec)
+
+    # (N, T) separations from a single matrix product per body
+    targets = unit_vectors(ra_rad, dec_rad).T
+    sun_sep = np.degrees(np.arccos(np.clip(targets @ ephemeris.sun, -1.0, 1.0)))
+    moon_sep = np.degrees(np.arccos(np.clip(targets @ ephemeris.moon, -1.0, 1.0)))
+
+    latitude = np.radians(settings.CALCULATOR_LATITUDE)
+    hour_angle = ephemeris.local_sidereal_time[np.newaxis, :] - ra_rad[:, np.newaxis]
+    dec_col = dec_rad[:, np.newaxis]
+    sin_elevation = np.sin(latitude) * np.sin(dec_col) + np.cos(latitude) * np.cos(dec_col) * np.cos(hour_angle)
+    elevation = np.degrees(np.arcsin(np.clip(sin_elevation, -1.0, 1.0)))
+
+    observable = (
+        (elevation >= settings.CALCULATOR_MIN_ELEVATION)
+        & (sun_sep >= settings.CALCULATOR_MIN_SUN_SEP)
+        & (moon_sep >= settings.CALCULATOR_MIN_MOON_SEP)
+    )
+
+    # Group the samples by day: (N, D, samples_per_day)
+    shape = (len(ra), len(ephemeris.days), ephemeris.samples_per_day)
+    observable = observable.reshape(shape)
+
+    def observable_extrema(values):
+        values = values.reshape(shape)
+        return (
+            np.where(observable, values, np.inf).min(axis=-1),
+            np.where(observable, values, -np.inf).max(axis=-1),
+        )
+
+    sun_sep_min, sun_sep_max = observable_extrema(sun_sep)
+    moon_sep_min, moon_sep_max = observable_extrema(moon_sep)
+    elevation_min, elevation_max = observable_extrema(elevation)
+    t_observability = observable.sum(axis=-1) * step
+
+    rows = []
+    for target, day in zip(*np.nonzero(t_observability)):
+        t_start = int(ephemeris.days[day])
+        rows.append(
+            {
+                "id": None,
+                "t_validity": t_start + 1 + settings.CALCULATOR_VALIDITY_DAYS,
+                "t_start": t_start,
+                "t_stop": t_start + 1,
+                "t_observability": float(t_observability[target, day]),
+                "validity_accuracy": "MEDIUM",
+                "validity_predictor": PREDICTOR_NAME,
+                "pos_angle": None,
+                "em_threshold": None,
+                "target_name": f"{ra[target]:.6f},{dec[target]:.6f}",
+                "em_min": None,
+                "em_max": None,
+                "elevation_min": round(float(elevation_min[target, day]), 3),
+                "elevation_max": round(float(elevation_max[target, day]), 3),
+                "moon_sep_min": round(float(moon_sep_min[target, day]), 3),
+                "moon_sep_max": round(float(moon_sep_max[target, day]), 3),
+                "sun_sep_min": round(float(sun_sep_min[target, day]), 3),
+                "sun_sep_max": round(float(sun_sep_max[target, day]), 3),
+                "facility": settings.CALCULATOR_FACILITY,
+                "s_ra": float(ra[target]),
+                "s_dec": float(dec[target]),
+            }
+        )
+
+    return rows
@@ -0,0 +1,232 @@
+"""Per-query deadlines and cancellation for the ObjObsSAP service.
+
+A QueryScope follows a single /query through the threadpool. The service attaches a database session to the scope
+while it runs a statement, and checks the scope between stages. When the deadline passes or the client disconnects,
+the scope cancels the statements running on the attached connections and the next check stops the remaining work.
+
+The scope also records what the query did (its statements, stage timings and result size) for the slow-query log.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from starlette.requests import Request
+
+from fastapi_objobssap.exceptions import ClientDisconnectedError, QueryTimeoutError
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks for a disconnected client
+DISCONNECT_POLL_INTERVAL = 0.1
+
+# Postgres SQLSTATE for a statement cancelled by a cancel request or statement_timeout
+QUERY_CANCELED_PGCODE = "57014"
+
+
+def cancel_statement(dbapi_connection):
+    """Interrupt the statement running on a DBAPI connection, from any thread.
+
+    psycopg2 connections send a cancel request to the server, sqlite3 connections interrupt the running statement.
+    """
+
+    cancel = getattr(dbapi_connection, "cancel", None) or getattr(dbapi_connection, "interrupt", None)
+    if cancel is None:
+        return
+
+    try:
+        cancel()
+    except Exception:  # pylint: disable=broad-except
+        logger.warning("Could not cancel a running statement", exc_info=True)
+
+
+class QueryScope:
+    """Deadline, cancellation and profiling state for a single query."""
+
+    def __init__(self, timeout: float = None):
+        self.started = time.monotonic()
+        self.timeout = timeout
+        self.deadline = self.started + timeout if timeout else None
+        self.disconnected = False
+        self.cancelled = threading.Event()
+        self.connections = []
+        self.lock = threading.Lock()
+
+        # Scopes for parts of the query, such as each backend of a fan-out
+        self.parent = None
+        self.children = []
+
+        # Called once the work in the threadpool has finished, even if the request gave up on it earlier
+        self.finish_callbacks = []
+        self.work_started = False
+
+        # Profiling, for the slow-query log
+        self.timings = {}
+        self.statements = []
+        self.row_count = None
+        self.overflow = None
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the query started."""
+        return time.monotonic() - self.started
+
+    @property
+    def expired(self) -> bool:
+        """Whether the deadline has passed."""
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def error(self) -> Exception:
+        """Return the exception describing why the query was stopped."""
+        if self.disconnected:
+            return ClientDisconnectedError()
+        if self.timeout:
+            return QueryTimeoutError(f"Query exceeded the {self.timeout:g}s time limit.")
+        return QueryTimeoutError("Query exceeded the database statement time limit.")
+
+    def check(self):
+        """Stop the query if it was cancelled or ran past its deadline."""
+        if self.cancelled.is_set() or self.expired:
+            raise self.error()
+
+    @contextmanager
+    def attach(self, session):
+        """Make the session's connection cancellable while the block runs, and bound Postgres statements by the
+        remaining time.
+
+        The connection is detached before the block exits, so a cancellation can never reach a connection that
+        has gone back to the pool and is running another request's statement.
+        """
+
+        self.check()
+
+        connection = session.connection()
+
+        if connection.dialect.name == "postgresql" and self.deadline is not None:
+            remaining_ms = max(1, int((self.deadline - time.monotonic()) * 1000))
+            # SET LOCAL only lasts until the end of the session's transaction, it is reset when the session closes
+            session.execute(text(f"SET LOCAL statement_timeout = {remaining_ms}"))
+
+        dbapi_connection = connection.connection.dbapi_connection
+        with self.lock:
+            self.connections.append(dbapi_connection)
+
+        try:
+            # The scope may have been cancelled while the connection was being checked out
+            self.check()
+            yield
+        finally:
+            with self.lock:
+                self.connections.remove(dbapi_connection)
+
+    def cancel(self, disconnected: bool = False):
+        """Cancel the query, interrupting any statement running on an attached connection."""
+
+        self.disconnected = self.disconnected or disconnected
+        self.cancelled.set()
+
+        # Held while cancelling, so no connection can be detached and reused in the meantime
+        with self.lock:
+            for dbapi_connection in self.connections:
+                cancel_statement(dbapi_connection)
+            children = list(self.children)
+
+        for child in children:
+            child.cancel(disconnected)
+
+    def child(self, timeout: float = None) -> "QueryScope":
+        """Create a scope for part of the query, cancelled along with this one.
+
+        The child's deadline is the given timeout, capped by this scope's remaining time, so that part of the
+        query can be cancelled on its own once it takes too long.
+        """
+
+        if self.deadline is not None:
+            remaining = max(0.001, self.deadline - time.monotonic())
+            timeout = min(timeout, remaining) if timeout else remaining
+
+        child = QueryScope(timeout=timeout)
+        child.parent = self
+
+        with self.lock:
+            self.children.append(child)
+
+        if self.cancelled.is_set():
+            child.cancel(self.disconnected)
+
+        return child
+
+    def on_finished(self, callback):
+        """Register a callback to run once the query's work in the threadpool has finished."""
+        self.finish_callbacks.append(callback)
+
+    def finished(self):
+        """Run the finish callbacks."""
+        for callback in self.finish_callbacks:
+            callback()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a stage of the query."""
+        stage_start = time.monotonic()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.timings[name] = self.timings.get(name, 0.0) + time.monotonic() - stage_start
+
+    def record_statement(self, bind, statement):
+        """Record a statement run for the query, along with the engine it ran on."""
+        if self.parent is not None:
+            self.parent.record_statement(bind, statement)
+            return
+        with self.lock:
+            self.statements.append((bind, statement))
+
+    @contextmanager
+    def guard(self):
+        """Translate the errors of a cancelled statement into the scope's error."""
+        try:
+            yield
+        except DBAPIError as exc:
+            pgcode = getattr(exc.orig, "pgcode", None)
+            if self.cancelled.is_set() or pgcode == QUERY_CANCELED_PGCODE:
+                raise self.error() from exc
+            raise
+
+
+async def run_cancellable(request: Request, scope: QueryScope, func, /, *args, **kwargs):
+    """Run a blocking function in the threadpool, cancelling it if the client disconnects or the deadline passes.
+
+    The response is returned as soon as the query is cancelled, the worker thread stops at its next check.
+    The scope's finish callbacks only run once the worker thread is done, so resources it holds until then
+    are not released early.
+    """
+
+    def on_done(done: asyncio.Future):
+        # Retrieve the outcome of abandoned tasks so their errors are not reported as unhandled
+        if not done.cancelled():
+            done.exception()
+        scope.finished()
+
+    task = asyncio.ensure_future(run_in_threadpool(func, *args, **kwargs))
+    scope.work_started = True
+    task.add_done_callback(on_done)
+
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+        if done:
+            return task.result()
+
+        if await request.is_disconnected():
+            scope.cancel(disconnected=True)
+            raise scope.error()
+
+        if scope.expired:
+            scope.cancel()
+            raise scope.error()
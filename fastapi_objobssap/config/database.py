@@ -1,6 +1,9 @@
 """This module contains the database configuration for the application."""
 
+import math
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
 
 from fastapi_objobssap.config.settings import get_settings
@@ -11,11 +14,47 @@ settings = get_settings()
 engine = create_engine(
     url=settings.POSTGRES_DATABASE_URL,
     pool_pre_ping=True,
-    pool_size=100,  # The size of the connection pool
-    max_overflow=50,  # The maximum number of connections that can be opened beyond the pool size. Set to -1 for no limit.
+    pool_size=settings.DB_POOL_SIZE,  # The size of the connection pool
+    max_overflow=settings.DB_MAX_OVERFLOW,  # The maximum number of connections that can be opened beyond the pool size.
 )
 SessionLocal = sessionmaker(bind=engine)
 
+
+def create_facility_engine(url: str):
+    """Create the engine for a single facility backend.
+
+    Each backend gets its own, smaller pool. Connecting, waiting for a SQLite lock and, on Postgres, running a
+    statement are all bounded by FACILITY_QUERY_TIMEOUT, so a backend that hangs cannot hold a fan-out thread
+    and its connection indefinitely.
+    """
+
+    backend = make_url(url).get_backend_name()
+    engine_kwargs = {"url": url, "pool_pre_ping": True}
+
+    # SQLite stand-ins (e.g. for local testing) use the dialect's default pool, which takes no sizing arguments
+    if backend != "sqlite":
+        engine_kwargs["pool_size"] = settings.FACILITY_POOL_SIZE
+        engine_kwargs["max_overflow"] = settings.FACILITY_MAX_OVERFLOW
+        engine_kwargs["pool_timeout"] = settings.FACILITY_QUERY_TIMEOUT
+    else:
+        engine_kwargs["connect_args"] = {"check_same_thread": False, "timeout": settings.FACILITY_QUERY_TIMEOUT}
+
+    if backend == "postgresql":
+        timeout_ms = int(settings.FACILITY_QUERY_TIMEOUT * 1000)
+        engine_kwargs["connect_args"] = {
+            "connect_timeout": max(1, math.ceil(settings.FACILITY_QUERY_TIMEOUT)),
+            "options": f"-c statement_timeout={timeout_ms}",
+        }
+
+    return create_engine(**engine_kwargs)
+
+
+facility_engines = {facility: create_facility_engine(url) for facility, url in settings.FACILITY_DATABASE_URLS.items()}
+FacilitySessions = {
+    facility: sessionmaker(bind=facility_engine) for facility, facility_engine in facility_engines.items()
+}
+
+
 @contextmanager
 def get_db():
     """This function starts a db session"""
@@ -24,3 +63,13 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+@contextmanager
+def get_facility_db(facility: str):
+    """This function starts a db session against the backend for the given facility."""
+    db = FacilitySessions[facility]()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -11,6 +11,61 @@ class Settings(BaseSettings):
 
     # DB Settings
     POSTGRES_DATABASE_URL: str = os.environ.get("POSTGRES_DATABASE_URL")
+    DB_POOL_SIZE: int = 20  # The size of the connection pool, per worker. Matches ADMISSION_MAX_CONCURRENT.
+    DB_MAX_OVERFLOW: int = 5  # Connections allowed beyond the pool size, per worker. Set to -1 for no limit.
+
+    # Query Settings
+    QUERY_TIMEOUT: float = 30.0  # Seconds a /query may take before it is cancelled. Set to 0 to disable.
+
+    # Admission Control Settings
+    ADMISSION_MAX_CONCURRENT: int = 20  # Queries run at once, per worker. Set to 0 to disable admission control.
+    ADMISSION_MAX_HEAVY: int = 5  # Heavy queries (large MAXREC or no TIME) run at once, per worker
+    ADMISSION_HEAVY_MAXREC: int = 10000  # MAXREC above which a query is heavy
+    ADMISSION_MAX_QUEUE: int = 50  # Queries waiting for a slot, per worker, before new ones are rejected
+    ADMISSION_QUEUE_TIMEOUT: float = 5.0  # Seconds a query may wait for a slot before it is rejected
+    ADMISSION_RETRY_AFTER: int = 5  # Retry-After (s) sent with rejections
+
+    # Slow Query Log Settings
+    SLOW_QUERY_THRESHOLD: float = 1.0  # Seconds after which a /query is logged as slow. Set to 0 to disable.
+    SLOW_QUERY_EXPLAIN_RATE: float = 0.1  # Fraction of slow queries re-run under EXPLAIN (ANALYZE, BUFFERS)
+    SLOW_QUERY_PLAN_FILE: str = "slow_query_plans.jsonl"  # JSON lines file the captured plans are appended to
+
+    # Federation Settings
+    # Mapping of facility name to database URL, e.g. '{"HST": "postgresql://...", "VLT": "sqlite:///vlt.db"}'.
+    # When empty, all queries are served from POSTGRES_DATABASE_URL.
+    FACILITY_DATABASE_URLS: dict[str, str] = {}
+    FACILITY_POOL_SIZE: int = 10  # Connection pool size for each facility backend
+    FACILITY_MAX_OVERFLOW: int = 5  # Connections allowed beyond the pool size for each facility backend
+    FACILITY_QUERY_TIMEOUT: float = 10.0  # Seconds to wait on a single facility backend before dropping it
+
+    # Ingest Settings
+    INGEST_API_KEY: str | None = None  # Key expected in the X-API-Key header of ingest requests. Unset disables ingest.
+    INGEST_BATCH_SIZE: int = 1000  # Rows per upsert statement
+    INGEST_MAX_BYTES: int = 100 * 1024 * 1024  # Largest ingest request body accepted
+    PRUNE_INTERVAL: float = 0.0  # Seconds between prunes of expired windows. 0 disables pruning.
+    PRUNE_BATCH_SIZE: int = 1000  # Rows deleted per prune statement
+
+    # Observability Calculator Settings
+    CALCULATOR_ENABLED: bool = False  # Compute windows on the fly when a query finds no stored ones
+    CALCULATOR_WRITE_BACK: bool = False  # Store computed windows in the database
+    CALCULATOR_FACILITY: str = "VLT"  # Facility the computed windows are for
+    CALCULATOR_LATITUDE: float = -24.6272  # Facility geodetic latitude (degrees)
+    CALCULATOR_LONGITUDE: float = -70.4042  # Facility geodetic longitude (degrees, east positive)
+    CALCULATOR_HEIGHT: float = 2635.0  # Facility height above the ellipsoid (m)
+    CALCULATOR_MIN_ELEVATION: float = 30.0  # Minimum target elevation (degrees)
+    CALCULATOR_MIN_SUN_SEP: float = 45.0  # Minimum Sun separation (degrees)
+    CALCULATOR_MIN_MOON_SEP: float = 10.0  # Minimum Moon separation (degrees)
+    CALCULATOR_TIME_STEP: int = 600  # Time grid step (s), must divide a day
+    CALCULATOR_DEFAULT_DAYS: int = 7  # Days computed when no TIME is given
+    CALCULATOR_MAX_DAYS: int = 366  # Longest TIME range computed on the fly
+    CALCULATOR_VALIDITY_DAYS: int = 30  # Days after a window that its calculation stays valid
+    CALCULATOR_EPHEMERIS_CACHE_SIZE: int = 800  # Days of ephemerides kept in memory, about 8 kB each
+    CALCULATOR_RESULT_CACHE_SIZE: int = 1024  # Computed queries whose windows are kept in memory
+    CALCULATOR_IERS_AUTO_DOWNLOAD: bool = False  # Let astropy download current IERS data, needs network access
+
+    # Snapshot Settings
+    SNAPSHOT_DIR: str | None = None  # Directory of memory-mapped snapshots to serve queries from. Unset disables.
+    SNAPSHOT_KEEP: int = 2  # Snapshot versions kept on disk after an export
 
     class Config:
         """The configuration for the settings."""
@@ -13,6 +13,23 @@ VOTABLE_ERROR_XML = """<?xml version="1.0" encoding="UTF-8"?>
   <INFO ID="Error" name="Error" value="{error}"/>
 </VOTABLE>"""
 
+
+class QueryTimeoutError(Exception):
+    """Raised when a query runs past its deadline."""
+
+
+class ClientDisconnectedError(Exception):
+    """Raised when the client disconnects before its query has finished."""
+
+
+class ServiceOverloadedError(Exception):
+    """Raised when a query is shed by admission control."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
 # Error handlers
 
 
@@ -47,3 +64,26 @@ async def validation_exception_handler(request, exc) -> XMLResponse:  # pylint:
     errors = exc.errors()
     error_str = ", ".join([f"Error in {e['loc'][0]} {e['loc'][1]}: {e['msg']}" for e in errors])
     return votable_error_response(error_str, 400)
+
+
+async def query_timeout_exception_handler(request, exc) -> XMLResponse:  # pylint: disable=unused-argument
+    """Exception handler for queries cancelled at their deadline."""
+
+    return votable_error_response(str(exc), 504)
+
+
+async def client_disconnected_exception_handler(request, exc) -> XMLResponse:  # pylint: disable=unused-argument
+    """Exception handler for queries cancelled because the client went away.
+
+    Nobody will read the response, the handler only keeps the error out of the general handler.
+    """
+
+    return votable_error_response("Client disconnected.", 499)
+
+
+async def service_overloaded_exception_handler(request, exc) -> XMLResponse:  # pylint: disable=unused-argument
+    """Exception handler for queries shed by admission control."""
+
+    response = votable_error_response(str(exc), 503)
+    response.headers["Retry-After"] = str(exc.retry_after)
+    return response
@@ -1,21 +1,51 @@
 """This module contains the main FastAPI application."""
 
+import asyncio
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI
 
+from fastapi_objobssap.config.settings import get_settings
 from fastapi_objobssap.middleware import UppercaseQueryParamsMiddleware
+from fastapi_objobssap.router.ingest import ingest_router
+from fastapi_objobssap.router.metrics import metrics_router
 from fastapi_objobssap.router.objobssap_router import objobssap_router
 from fastapi_objobssap.router.vosi import vosi_router
 from fastapi_objobssap.exceptions import (
+    ClientDisconnectedError,
+    QueryTimeoutError,
+    ServiceOverloadedError,
+    client_disconnected_exception_handler,
     general_exception_handler,
     http_exception_handler,
+    query_timeout_exception_handler,
+    service_overloaded_exception_handler,
     validation_exception_handler,
 )
+from fastapi_objobssap.tasks import prune_expired_windows_periodically
 from fastapi.exceptions import HTTPException
 from fastapi.exceptions import RequestValidationError
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):  # pylint: disable=unused-argument
+    """Start and stop the background tasks."""
+
+    prune_task = None
+    if get_settings().PRUNE_INTERVAL > 0:
+        prune_task = asyncio.create_task(prune_expired_windows_periodically())
+
+    yield
+
+    if prune_task:
+        prune_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await prune_task
+
+
 app = FastAPI(
     title="ObjObsSAP API",
+    lifespan=lifespan,
 )
 
 # Middleware
@@ -24,8 +54,13 @@ app.add_middleware(UppercaseQueryParamsMiddleware)
 # Routers
 app.include_router(objobssap_router, tags=["Example Docs"])
 app.include_router(vosi_router, tags=["VOSI"])
+app.include_router(ingest_router, tags=["Ingest"])
+app.include_router(metrics_router, tags=["Metrics"])
 
 # Exception Handlers
 app.add_exception_handler(Exception, general_exception_handler)
 app.add_exception_handler(HTTPException, http_exception_handler)
-app.add_exception_handler(RequestValidationError, validation_exception_handler)
\ No newline at end of file
+app.add_exception_handler(RequestValidationError, validation_exception_handler)
+app.add_exception_handler(QueryTimeoutError, query_timeout_exception_handler)
+app.add_exception_handler(ClientDisconnectedError, client_disconnected_exception_handler)
+app.add_exception_handler(ServiceOverloadedError, service_overloaded_exception_handler)
@@ -1,29 +1,31 @@
 """Middleware for the ObjObsSAP API."""
 
-from urllib.parse import urlencode
+from urllib.parse import parse_qsl, urlencode
 
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.types import ASGIApp
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 
-class UppercaseQueryParamsMiddleware(BaseHTTPMiddleware):
+class UppercaseQueryParamsMiddleware:
     """Middleware to convert all query parameter names to uppercase.
 
     The DALI spec requires that query parameter names are case-insensitive,
     and this middleware ensures that all query parameter names are converted to uppercase for consistency.
+
+    This is a plain ASGI middleware rather than a BaseHTTPMiddleware, so that endpoints receive the client's
+    disconnect message directly and can stop work for clients that have gone away.
     """
 
     def __init__(self, app: ASGIApp):
-        super().__init__(app)
+        self.app = app
 
-    async def dispatch(self, request: Request, call_next):
-        # Convert query parameter names to uppercase
-        original_query = request.query_params.multi_items()
-        upper_query = [(key.upper(), value) for key, value in original_query]
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http":
+            # Convert query parameter names to uppercase
+            original_query = parse_qsl(scope["query_string"].decode("latin-1"), keep_blank_values=True)
+            upper_query = [(key.upper(), value) for key, value in original_query]
 
-        # Replace the scope's query string with the normalized version
-        new_query_string = urlencode(upper_query, doseq=True)
-        request.scope["query_string"] = new_query_string.encode("utf-8")
+            # Replace the scope's query string with the normalized version
+            new_query_string = urlencode(upper_query, doseq=True)
+            scope = dict(scope, query_string=new_query_string.encode("utf-8"))
 
-        return await call_next(request)
+        await self.app(scope, receive, send)
@@ -1,9 +1,9 @@
 """This module contains the database sqlalchemy models for the ObjObsSAP module."""
 
-from sqlalchemy import Column, Float, Integer, String
+from sqlalchemy import Column, Float, Integer, String, UniqueConstraint
 from sqlalchemy.orm import DeclarativeBase
 
-from fastapi_objobssap.config.database import engine
+from fastapi_objobssap.config.database import engine, facility_engines
 
 
 class Base(DeclarativeBase):
@@ -22,8 +22,13 @@ class ObjObsSAPModel(Base):
 
     __tablename__ = "objobssap"
 
+    # Ingested windows are upserted on (target, facility, window)
+    __table_args__ = (UniqueConstraint("target_name", "facility", "t_start", "t_stop", name="uq_objobssap_window"),)
+
     id = Column(Integer, primary_key=True, index=True)
-    t_validity = Column(Integer, nullable=False, comment="Date when the observability calculation will change (MJD)")
+    t_validity = Column(
+        Integer, nullable=False, index=True, comment="Date when the observability calculation will change (MJD)"
+    )
     t_start = Column(Integer, nullable=False, comment="Observability window start time (MJD)")
     t_stop = Column(Integer, nullable=False, comment="Observability window end time (MJD)")
     t_observability = Column(Float, nullable=False, comment="Observability duration window (s)")
@@ -86,4 +91,18 @@ class ObsMetadata(Base):
     unit = Column(String, comment="Unit of the column (if applicable)")
 
 
+class DataVersion(Base):
+    """Counter bumped on every change to the ObjObsSAP data.
+
+    Caches of query results can compare against it to know when they are stale.
+    """
+
+    __tablename__ = "objobssap_data_version"
+    id = Column(Integer, primary_key=True)
+
+    version = Column(Integer, nullable=False, default=0, comment="Incremented on every ingest or prune")
+
+
 Base.metadata.create_all(engine)
+for facility_engine in facility_engines.values():
+    Base.metadata.create_all(facility_engine)
@@ -0,0 +1,79 @@
+"""Bulk ingest router for the ObjObsSAP service."""
+
+import secrets
+from typing import Annotated, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security import APIKeyHeader
+from fastapi_restful.cbv import cbv
+
+from fastapi_objobssap.config.database import get_db
+from fastapi_objobssap.config.settings import get_settings
+from fastapi_objobssap.services import ingest_objobssap_rows
+
+ingest_router = APIRouter()
+
+api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
+
+
+def verify_ingest_key(api_key: Annotated[Optional[str], Depends(api_key_header)]):
+    """Check the ingest API key. Ingest is disabled unless INGEST_API_KEY is set."""
+
+    expected_key = get_settings().INGEST_API_KEY
+    if not expected_key:
+        raise HTTPException(status_code=403, detail="Ingest is disabled on this service.")
+    if not api_key or not secrets.compare_digest(api_key, expected_key):
+        raise HTTPException(status_code=401, detail="Invalid or missing API key.")
+
+
+async def read_limited_body(request: Request, max_bytes: int) -> bytes:
+    """Read the request body, rejecting it with a 413 as soon as it is known to exceed max_bytes."""
+
+    too_large = HTTPException(status_code=413, detail=f"Ingest batches are limited to {max_bytes} bytes.")
+
+    content_length = request.headers.get("content-length")
+    if content_length is not None:
+        try:
+            declared_size = int(content_length)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Content-Length header.")
+        if declared_size > max_bytes:
+            raise too_large
+
+    # The header may be missing (chunked uploads) or wrong, so the streamed size is checked too
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_bytes:
+            raise too_large
+        chunks.append(chunk)
+
+    return b"".join(chunks)
+
+
+@cbv(ingest_router)
+class IngestRouter:
+    """Router for the ObjObsSAP bulk ingest endpoint."""
+
+    @ingest_router.post(
+        "/ingest",
+        summary="Bulk upsert ObjObsSAP rows.",
+        dependencies=[Depends(verify_ingest_key)],
+    )
+    async def ingest(
+        self,
+        request: Request,
+        content_type: Annotated[str, Header(description="VOTable, CSV or Parquet media type")] = "text/xml",
+        db=Depends(get_db),
+    ):
+        """Upsert a VOTable, CSV or Parquet batch of ObjObsSAP rows, keyed on (target, facility, window).
+
+        Bodies larger than INGEST_MAX_BYTES are rejected before they are read in full.
+        """
+
+        content = await read_limited_body(request, get_settings().INGEST_MAX_BYTES)
+
+        # Parsing the batch is CPU-bound, so it runs in the threadpool along with the upsert
+        return await run_in_threadpool(ingest_objobssap_rows, content, content_type, db)
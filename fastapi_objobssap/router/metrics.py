@@ -0,0 +1,23 @@
+"""Metrics router for the ObjObsSAP service."""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from fastapi_restful.cbv import cbv
+
+from fastapi_objobssap.admission import admission_controller
+
+metrics_router = APIRouter()
+
+
+@cbv(metrics_router)
+class MetricsRouter:
+    """Router for the service metrics endpoint."""
+
+    @metrics_router.get("/metrics", summary="Get the service metrics.", response_class=PlainTextResponse)
+    def metrics(self):
+        """Get the admission control metrics in the Prometheus text format."""
+
+        if admission_controller is None:
+            return PlainTextResponse("")
+
+        return PlainTextResponse(admission_controller.metrics(), media_type="text/plain; version=0.0.4")
@@ -3,12 +3,16 @@
 
 from typing import Annotated, Optional
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request
 from fastapi_restful.cbv import cbv
 
 from fastapi_objobssap import schemas
+from fastapi_objobssap.admission import admission_controller, is_heavy_query
+from fastapi_objobssap.cancellation import QueryScope, run_cancellable
 from fastapi_objobssap.config.database import get_db
+from fastapi_objobssap.config.settings import get_settings
 from fastapi_objobssap.services import perform_objobssap_operation
+from fastapi_objobssap.slow_query import normalize_parameters, record_slow_query
 
 objobssap_router = APIRouter()
 
@@ -18,8 +22,9 @@ class ObjObsSAPRouter:
     """Router for ObjObsSAP API endpoints."""
 
     @objobssap_router.get("/query", summary="Perform an ObjObsSAP query.")
-    def objobssap_request(
+    async def objobssap_request(
         self,
+        request: Request,
         pos: Annotated[
             str,
             Query(
@@ -75,21 +80,53 @@ class ObjObsSAPRouter:
         ] = "votable",
         db=Depends(get_db),
     ):
-        """Perform an ObjObsSAP query."""
+        """Perform an ObjObsSAP query.
+
+        The query waits for an admission slot, and is rejected if the worker is overloaded.
+        It is cancelled if the client disconnects or it runs longer than QUERY_TIMEOUT,
+        and logged if it runs longer than SLOW_QUERY_THRESHOLD.
+        """
+
+        scope = QueryScope(timeout=get_settings().QUERY_TIMEOUT)
 
         position = schemas.PositionParameter(POS=pos)
 
         if time:
             time = schemas.TimeParameter(TIME=time)
 
-        data = perform_objobssap_operation(
-            pos=position,
-            time=time,
-            min_obs=min_obs,
-            facility=facility,
-            maxrec=maxrec,
-            response_format=responseformat,
-            db=db,
-        )
+        heavy = is_heavy_query(time, maxrec)
+        admitted = False
+
+        error = None
+        try:
+            if admission_controller:
+                with scope.stage("admission"):
+                    await admission_controller.acquire(heavy)
+                admitted = True
+                # The slot is held until the worker thread is done, not just until the response is sent
+                scope.on_finished(lambda: admission_controller.release(heavy))
+
+            data = await run_cancellable(
+                request,
+                scope,
+                perform_objobssap_operation,
+                pos=position,
+                time=time,
+                min_obs=min_obs,
+                facility=facility,
+                maxrec=maxrec,
+                response_format=responseformat,
+                db=db,
+                scope=scope,
+            )
+        except Exception as exc:
+            error = exc
+            raise
+        finally:
+            if admitted and not scope.work_started:
+                admission_controller.release(heavy)
+
+            parameters = normalize_parameters(position, time, min_obs, facility, maxrec, responseformat)
+            record_slow_query(parameters, scope, error)
 
         return data
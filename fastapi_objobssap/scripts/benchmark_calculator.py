@@ -0,0 +1,44 @@
+"""Benchmark the on-the-fly observability calculator in targets per second for batched positions."""
+
+import argparse
+import time
+
+import numpy as np
+
+from fastapi_objobssap.calculator import compute_ephemeris, compute_observability
+from fastapi_objobssap.config.settings import get_settings
+
+
+def benchmark(batch_sizes: list[int], days: int, start: int, repeats: int):
+    """Time the calculator for each batch size, after computing the ephemeris for the grid once."""
+
+    rng = np.random.default_rng(1138)
+    end = start + days
+
+    tic = time.perf_counter()
+    compute_ephemeris(start, end, get_settings().CALCULATOR_TIME_STEP)
+    print(f"Ephemeris for {days} days computed in {time.perf_counter() - tic:.3f}s (days cached for the runs below)")
+
+    for batch_size in batch_sizes:
+        ra = rng.uniform(0, 360, batch_size)
+        dec = np.degrees(np.arcsin(rng.uniform(-1, 1, batch_size)))
+
+        timings = []
+        for _ in range(repeats):
+            tic = time.perf_counter()
+            rows = compute_observability(ra, dec, start, end)
+            timings.append(time.perf_counter() - tic)
+
+        best = min(timings)
+        print(f"{batch_size:>7} targets: {best:.4f}s, {batch_size / best:,.0f} targets/s, {len(rows)} windows")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1000, 10000])
+    parser.add_argument("--days", type=int, default=7, help="Length of the time grid in days")
+    parser.add_argument("--start", type=int, default=61000, help="Start of the time grid (MJD)")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per batch size, the best is reported")
+    args = parser.parse_args()
+
+    benchmark(args.batch_sizes, args.days, args.start, args.repeats)
@@ -0,0 +1,23 @@
+"""Export the ObjObsSAP table to a new memory-mapped snapshot and publish it to SNAPSHOT_DIR."""
+
+import argparse
+
+from fastapi_objobssap.config.database import get_db
+from fastapi_objobssap.config.settings import get_settings
+from fastapi_objobssap.snapshot import export_snapshot
+
+
+if __name__ == "__main__":
+    settings = get_settings()
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--snapshot-dir", default=settings.SNAPSHOT_DIR, help="Defaults to SNAPSHOT_DIR")
+    parser.add_argument("--keep", type=int, default=settings.SNAPSHOT_KEEP, help="Snapshot versions to keep")
+    args = parser.parse_args()
+
+    if not args.snapshot_dir:
+        parser.error("No snapshot directory given and SNAPSHOT_DIR is not set.")
+
+    with get_db() as session:
+        path = export_snapshot(session, args.snapshot_dir, args.keep)
+    print(f"Snapshot published at {path}")
@@ -3,7 +3,8 @@
 import random
 
 from fastapi_objobssap.config.database import get_db
-from fastapi_objobssap.models import ObjObsSAPModel, ObsMetadata
+from fastapi_objobssap.models import ObsMetadata
+from fastapi_objobssap.services import bump_data_version, upsert_objobssap_rows
 
 
 def init_metadata():
@@ -90,35 +91,36 @@ def init_fake_data():
 
     random.seed(1138)
 
+    rows = []
     for _ in range(1000):
-        with get_db() as session:
-            t_start = random.randint(59000, 60000)
-            t_stop = t_start + random.randint(1, 10)
-
-            t_observability = (t_stop - t_start) * 86400  # Convert days to seconds
-            t_validity = t_stop + random.randint(30, 365)  # Validity period in days
-
-            validity_accuracy = random.choice(fake_validity_accuracy)
-            validity_predictor = "Predictor_" + str(random.randint(1, 10))
-
-            s_ra = round(random.uniform(0, 360), 3)  # Random RA in degrees
-            s_dec = round(random.uniform(-90, 90), 3)  # Random Dec in degrees
-
-            pos_angle = round(random.uniform(0, 360), 3)  # Random angle in degrees
-            em_threshold = round(random.uniform(0.1, 100.0), 3)
-            target_name = "Target_" + str(random.randint(1, 100))
-            em_min = round(random.uniform(0.1, 10.0), 3)
-            em_max = round(em_min + random.uniform(0.1, 10.0), 3)
-
-            elevation_min = round(random.uniform(0, 90), 3)  # Random elevation in degrees
-            elevation_max = round(elevation_min + random.uniform(0, 90 - elevation_min), 3)
-            moon_sep_min = round(random.uniform(0, 180), 3)
-            moon_sep_max = round(moon_sep_min + random.uniform(0, 180 - moon_sep_min), 3)
-            sun_sep_min = round(random.uniform(0, 180), 3)
-            sun_sep_max = round(sun_sep_min + random.uniform(0, 180 - sun_sep_min), 3)
-
-            facility = random.choice(fake_facilities)
-            objobs_sap_entry = ObjObsSAPModel(
+        t_start = random.randint(59000, 60000)
+        t_stop = t_start + random.randint(1, 10)
+
+        t_observability = (t_stop - t_start) * 86400  # Convert days to seconds
+        t_validity = t_stop + random.randint(30, 365)  # Validity period in days
+
+        validity_accuracy = random.choice(fake_validity_accuracy)
+        validity_predictor = "Predictor_" + str(random.randint(1, 10))
+
+        s_ra = round(random.uniform(0, 360), 3)  # Random RA in degrees
+        s_dec = round(random.uniform(-90, 90), 3)  # Random Dec in degrees
+
+        pos_angle = round(random.uniform(0, 360), 3)  # Random angle in degrees
+        em_threshold = round(random.uniform(0.1, 100.0), 3)
+        target_name = "Target_" + str(random.randint(1, 100))
+        em_min = round(random.uniform(0.1, 10.0), 3)
+        em_max = round(em_min + random.uniform(0.1, 10.0), 3)
+
+        elevation_min = round(random.uniform(0, 90), 3)  # Random elevation in degrees
+        elevation_max = round(elevation_min + random.uniform(0, 90 - elevation_min), 3)
+        moon_sep_min = round(random.uniform(0, 180), 3)
+        moon_sep_max = round(moon_sep_min + random.uniform(0, 180 - moon_sep_min), 3)
+        sun_sep_min = round(random.uniform(0, 180), 3)
+        sun_sep_max = round(sun_sep_min + random.uniform(0, 180 - sun_sep_min), 3)
+
+        facility = random.choice(fake_facilities)
+        rows.append(
+            dict(
                 t_validity=t_validity,
                 t_start=t_start,
                 t_stop=t_stop,
@@ -140,8 +142,12 @@ def init_fake_data():
                 s_dec=s_dec,
                 facility=facility,
             )
-            session.add(objobs_sap_entry)
-            session.commit()
+        )
+
+    with get_db() as session:
+        upsert_objobssap_rows(session, rows)
+        bump_data_version(session)
+        session.commit()
 
 
 if __name__ == "__main__":
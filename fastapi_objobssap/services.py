@@ -4,27 +4,85 @@ This module should be replaced with the implementation of the developed service.
 """
 
 import io
+import logging
+import time as time_module
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import ExitStack, nullcontext
+from functools import partial
 
 from astropy.io.votable import from_table, writeto
 from astropy.io.votable.tree import Info, VOTableFile
-from astropy.table import Table
+from astropy.table import MaskedColumn, Table
+from fastapi import HTTPException
+from sqlalchemy import delete, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
 
-from fastapi_objobssap.models import ObjObsSAPModel, ObsMetadata
+from fastapi_objobssap.calculator import LRUCache, compute_observability
+from fastapi_objobssap.cancellation import QueryScope
+from fastapi_objobssap.config.database import FacilitySessions, get_db, get_facility_db
+from fastapi_objobssap.config.settings import get_settings
+from fastapi_objobssap.models import DataVersion, ObjObsSAPModel, ObsMetadata
 from fastapi_objobssap.responses import XMLResponse
 from fastapi_objobssap.schemas import PositionParameter, TimeParameter
+from fastapi_objobssap.snapshot import Snapshot, column_dtype, snapshot_store
 
+logger = logging.getLogger(__name__)
 
-def handle_response_format(results, metadata, response_format, overflow):
+settings = get_settings()
+
+# Shared across requests so that a backend which times out does not block the request on executor shutdown
+federation_executor = ThreadPoolExecutor(
+    max_workers=max(1, len(FacilitySessions)) * (settings.FACILITY_POOL_SIZE + settings.FACILITY_MAX_OVERFLOW),
+    thread_name_prefix="objobssap-federation",
+)
+
+# Name of the default database in the federated fan-out, where facilities without a backend of their own are stored
+DEFAULT_BACKEND = "default database"
+
+# Windows computed by the calculator, keyed on (ra, dec, start, end), so repeated queries are not recomputed
+computed_windows = LRUCache(settings.CALCULATOR_RESULT_CACHE_SIZE)
+
+
+def results_to_table(results: list[dict]) -> Table:
+    """Build a table of ObjObsSAP rows typed after the model columns, with NULLs as masked values."""
+
+    columns = []
+    for column in ObjObsSAPModel.__table__.columns:
+        values = [result.get(column.name) for result in results]
+        mask = [value is None for value in values]
+
+        dtype = column_dtype(column)
+        if dtype is None:
+            fill = ""
+            dtype = f"U{max((len(value) for value in values if value is not None), default=1) or 1}"
+        else:
+            fill = 0
+
+        data = [fill if masked else value for value, masked in zip(values, mask)]
+        columns.append(MaskedColumn(data, name=column.name, dtype=dtype, mask=mask))
+
+    return Table(columns)
+
+
+def handle_response_format(
+    results, metadata, response_format, overflow, scope: QueryScope = None, warnings: list[str] = None
+):
     """Handle the response format based on the requested format."""
 
+    scope = scope or QueryScope()
+
     # only 'votable' supported in this example implementation
     if response_format == "votable":
-        table = Table(results)
+        scope.check()
+        table = results_to_table(results)
         votable: VOTableFile = from_table(table)
 
         if overflow:
             votable.infos.append(Info(name="QUERY_STATUS", value="OVERFLOW"))
 
+        for warning in warnings or []:
+            votable.infos.append(Info(name="WARNING", value=warning))
+
         for meta in metadata:
             for field in votable.get_first_table().fields:
                 if field.name == meta["column_name"]:
@@ -33,6 +91,7 @@ def handle_response_format(results, metadata, response_format, overflow):
                     field.unit = meta.get("unit")
                     break
 
+        scope.check()
         buffer = io.BytesIO()
         writeto(votable, buffer)
         buffer.seek(0)
@@ -40,44 +99,557 @@ def handle_response_format(results, metadata, response_format, overflow):
         return XMLResponse(content=buffer.read())
 
 
-def perform_objobssap_operation(
-    pos: PositionParameter, time: TimeParameter, min_obs: int, facility: str, maxrec: int, response_format: str, db
+def build_objobssap_query(
+    session,
+    pos: PositionParameter,
+    time: TimeParameter,
+    min_obs: int,
+    facility: str,
+    exclude_facilities: list[str] = None,
 ):
-    """Perform the ObjObsSAP search with the given parameters."""
+    """Build the ObjObsSAP query for the given parameters against a single backend session."""
+
+    query_obj = session.query(ObjObsSAPModel)
+
+    # In real applications, POS filtering would most likely involve a more complex spatial query.
+    if pos:
+        query_obj = query_obj.filter(
+            ObjObsSAPModel.s_ra.between(pos.ra - 0.5, pos.ra + 0.5)
+            & ObjObsSAPModel.s_dec.between(pos.dec - 0.5, pos.dec + 0.5)
+        )
+
+    # The spec is somewhat ambiguous on how to handle the time range, so we take it here as to include the entire range.
+    if time:
+        query_obj = query_obj.filter(ObjObsSAPModel.t_start >= time.start, ObjObsSAPModel.t_stop <= time.end)
+
+    if min_obs is not None:
+        query_obj = query_obj.filter(ObjObsSAPModel.t_observability >= min_obs)
+
+    if facility:
+        query_obj = query_obj.filter(ObjObsSAPModel.facility == facility)
+
+    if exclude_facilities:
+        query_obj = query_obj.filter(
+            or_(ObjObsSAPModel.facility.is_(None), ObjObsSAPModel.facility.notin_(exclude_facilities))
+        )
+
+    return query_obj
+
+
+def query_objobssap_rows(
+    session,
+    pos: PositionParameter,
+    time: TimeParameter,
+    min_obs: int,
+    facility: str,
+    maxrec: int,
+    ordered=False,
+    scope: QueryScope = None,
+    exclude_facilities: list[str] = None,
+) -> list[dict]:
+    """Run the ObjObsSAP query, returning at most maxrec + 1 rows so the caller can detect an overflow.
+
+    The query is bound by the scope's deadline, and cancelled along with it.
+    """
+
+    scope = scope or QueryScope()
+
+    query_obj = build_objobssap_query(session, pos, time, min_obs, facility, exclude_facilities)
+
+    # Ordering is needed when partial results are merged, so every backend contributes its earliest windows
+    if ordered:
+        query_obj = query_obj.order_by(ObjObsSAPModel.t_start, ObjObsSAPModel.id)
+
+    query_obj = query_obj.limit(maxrec + 1)
+    scope.record_statement(session.get_bind(), query_obj.statement)
+
+    with scope.attach(session), scope.guard():
+        results = query_obj.all()
+
+    return [result.to_dict(as_str=False) for result in results]
+
+
+def truncate_results(results: list[dict], maxrec: int) -> tuple[list[dict], bool]:
+    """Truncate the results to MAXREC, returning the results and whether they overflowed."""
+
+    if len(results) > maxrec:
+        return results[:maxrec], True
+    return results, False
+
+
+def query_facility_backend(
+    facility: str, pos: PositionParameter, time: TimeParameter, min_obs: int, maxrec: int, scope: QueryScope = None
+) -> list[dict]:
+    """Query a single facility backend, for use in the federated fan-out.
+
+    Only the facility's own rows are returned, so facilities sharing a database are not merged twice.
+    """
+
+    with get_facility_db(facility) as session:
+        return query_objobssap_rows(session, pos, time, min_obs, facility, maxrec, ordered=True, scope=scope)
 
+
+def query_default_backend(
+    pos: PositionParameter,
+    time: TimeParameter,
+    min_obs: int,
+    maxrec: int,
+    scope: QueryScope = None,
+    snapshot: Snapshot = None,
+) -> list[dict]:
+    """Query the default database, or the snapshot serving it, for the facilities without a backend of their own."""
+
+    exclude_facilities = list(FacilitySessions)
+
+    if snapshot:
+        return snapshot.query(pos, time, min_obs, None, maxrec, exclude_facilities=exclude_facilities, ordered=True)
+
+    with get_db() as session:
+        return query_objobssap_rows(
+            session, pos, time, min_obs, None, maxrec, ordered=True, scope=scope, exclude_facilities=exclude_facilities
+        )
+
+
+def federated_objobssap_rows(
+    pos: PositionParameter,
+    time: TimeParameter,
+    min_obs: int,
+    maxrec: int,
+    scope: QueryScope = None,
+    snapshot: Snapshot = None,
+) -> tuple[list[dict], bool, list[str]]:
+    """Send the query to every facility backend, and the default database, concurrently and merge the results.
+
+    The default database holds the facilities without a backend of their own, it is served from the snapshot when
+    one is given.
+
+    Returns the merged results, whether they overflowed, and the backends missing from them. Backends that fail
+    or do not answer within FACILITY_QUERY_TIMEOUT are left out. The statement of a backend that timed out is
+    cancelled, its thread is only freed once the backend gives up the statement.
+    """
+
+    scope = scope or QueryScope()
+
+    backends = {facility: partial(query_facility_backend, facility) for facility in FacilitySessions}
+    backends[DEFAULT_BACKEND] = partial(query_default_backend, snapshot=snapshot)
+
+    backend_scopes = {name: scope.child(settings.FACILITY_QUERY_TIMEOUT) for name in backends}
+    futures = {
+        federation_executor.submit(backend, pos, time, min_obs, maxrec, backend_scopes[name]): name
+        for name, backend in backends.items()
+    }
+    done, not_done = wait(futures, timeout=settings.FACILITY_QUERY_TIMEOUT)
+
+    # A cancelled query fails every backend, report why rather than the backends as unavailable
+    scope.check()
+
+    missing = []
+
+    for future in not_done:
+        name = futures[future]
+        future.cancel()
+        backend_scopes[name].cancel()
+        missing.append(name)
+        logger.warning("Facility backend %s timed out after %ss", name, settings.FACILITY_QUERY_TIMEOUT)
+
+    results = []
     overflow = False
+    responded = 0
+
+    for future in done:
+        try:
+            backend_results = future.result()
+        except Exception:  # pylint: disable=broad-except
+            missing.append(futures[future])
+            logger.exception("Facility backend %s failed", futures[future])
+            continue
+
+        responded += 1
+        backend_results, backend_overflow = truncate_results(backend_results, maxrec)
+        overflow = overflow or backend_overflow
+        results.extend(backend_results)
+
+    if not responded:
+        raise HTTPException(status_code=503, detail="No facility backend is currently available.")
+
+    results.sort(key=lambda row: (row["t_start"], row["facility"] or "", row["id"]))
+    results, merged_overflow = truncate_results(results, maxrec)
+
+    return results, overflow or merged_overflow, sorted(missing)
+
+
+class LazySession:
+    """Opens the session of a get_db context manager on first use, to be closed along with an ExitStack."""
+
+    def __init__(self, db, stack: ExitStack):
+        self.db = db
+        self.stack = stack
+        self.session = None
+
+    def __call__(self):
+        if self.session is None:
+            self.session = self.stack.enter_context(self.db)
+        return self.session
+
+
+def perform_objobssap_operation(
+    pos: PositionParameter,
+    time: TimeParameter,
+    min_obs: int,
+    facility: str,
+    maxrec: int,
+    response_format: str,
+    db,
+    scope: QueryScope = None,
+):
+    """Perform the ObjObsSAP search with the given parameters.
+
+    If facility backends are configured, a FACILITY constraint routes the query to that facility's backend,
+    and a query without one is fanned out to all of them. Otherwise the default database is used.
+
+    When a snapshot is configured, queries for the default database are served from the memory-mapped snapshot,
+    and the default database session is only opened for calculator write-backs. When the calculator is enabled
+    and no stored windows match, they are computed on the fly instead.
+
+    The scope bounds the search by its deadline and stops it between stages once cancelled. It also records
+    the stage timings, statements and result size for the slow-query log.
+    """
+
+    scope = scope or QueryScope()
+    warnings = []
+
+    with ExitStack() as stack:
+        session = LazySession(db, stack)
+        snapshot = snapshot_store.get() if snapshot_store else None
+
+        with scope.stage("query"):
+            if facility in FacilitySessions:
+                with get_facility_db(facility) as facility_session:
+                    results = query_objobssap_rows(facility_session, pos, time, min_obs, facility, maxrec, scope=scope)
+                results, overflow = truncate_results(results, maxrec)
+            elif not facility and FacilitySessions:
+                results, overflow, missing = federated_objobssap_rows(
+                    pos, time, min_obs, maxrec, scope=scope, snapshot=snapshot
+                )
+                if missing:
+                    warnings.append(f"Results are incomplete, no response from: {', '.join(missing)}")
+            elif snapshot:
+                results = snapshot.query(pos, time, min_obs, facility, maxrec)
+                results, overflow = truncate_results(results, maxrec)
+            else:
+                results = query_objobssap_rows(session(), pos, time, min_obs, facility, maxrec, scope=scope)
+                results, overflow = truncate_results(results, maxrec)
+
+        # Positions without stored windows can be calculated on the fly for the calculator's facility
+        if not results and settings.CALCULATOR_ENABLED and facility in (None, "", settings.CALCULATOR_FACILITY):
+            scope.check()
+            with scope.stage("calculate"):
+                results = calculate_objobssap_rows(session, pos, time, min_obs)
+            results, overflow = truncate_results(results, maxrec)
+
+        with scope.stage("metadata"):
+            if snapshot:
+                metadata = snapshot.metadata
+            else:
+                with scope.guard():
+                    metadata = session().query(ObsMetadata).all()
+                metadata = [md.to_dict(as_str=False) for md in metadata]
+
+    scope.row_count = len(results)
+    scope.overflow = overflow
+
+    with scope.stage("serialize"):
+        response = handle_response_format(results, metadata, response_format, overflow, scope=scope, warnings=warnings)
+
+    return response
+
+
+# Columns identifying an observability window for upserts, matching the uq_objobssap_window constraint
+UPSERT_KEY = ["target_name", "facility", "t_start", "t_stop"]
+
+# Columns an ingested batch must provide
+INGEST_REQUIRED_COLUMNS = {"t_validity", "t_start", "t_stop", "t_observability", "s_ra", "s_dec", *UPSERT_KEY}
+
+# Content types accepted by the ingest endpoint, mapped to the astropy table reader format
+INGEST_FORMATS = {
+    "text/xml": "votable",
+    "application/xml": "votable",
+    "application/x-votable+xml": "votable",
+    "text/csv": "ascii.csv",
+    "application/vnd.apache.parquet": "parquet",
+    "application/x-parquet": "parquet",
+}
+
+
+def current_mjd() -> int:
+    """Return the current day as an integer MJD."""
+    return int(time_module.time() / 86400.0 + 40587)
+
+
+def read_ingest_table(content: bytes, content_type: str) -> Table:
+    """Read an ingested batch into an astropy table, based on the request content type."""
+
+    media_type = content_type.split(";")[0].strip().lower()
+    table_format = INGEST_FORMATS.get(media_type)
+    if table_format is None:
+        raise HTTPException(
+            status_code=415, detail=f"Unsupported content type '{media_type}'. Use VOTable, CSV or Parquet."
+        )
+
+    try:
+        # Always read from a file object, astropy takes a string without a newline for a file path
+        return Table.read(io.BytesIO(content), format=table_format)
+    except ImportError as exc:
+        raise HTTPException(status_code=415, detail=f"Reading {table_format} requires an optional dependency: {exc}")
+    except Exception as exc:  # pylint: disable=broad-except
+        raise HTTPException(status_code=400, detail=f"Could not read the {table_format} batch: {exc}")
+
+
+def table_to_objobssap_rows(table: Table) -> list[dict]:
+    """Convert an ingested table into ObjObsSAPModel row dictionaries.
+
+    Columns not in the model (including ``id``) are ignored, and masked values become NULL.
+    """
+
+    missing = INGEST_REQUIRED_COLUMNS - set(table.colnames)
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Missing required columns: {', '.join(sorted(missing))}")
+
+    columns = [column.name for column in ObjObsSAPModel.__table__.columns if column.name != "id"]
+    columns = [name for name in columns if name in table.colnames]
+
+    # tolist() turns masked entries into None
+    values = [table[name].tolist() for name in columns]
+    rows = [dict(zip(columns, row)) for row in zip(*values)]
+
+    for row in rows:
+        if any(row[key] is None for key in INGEST_REQUIRED_COLUMNS):
+            required = ", ".join(sorted(INGEST_REQUIRED_COLUMNS))
+            raise HTTPException(status_code=400, detail=f"Required columns may not be empty: {required}")
+
+    return rows
+
+
+def dialect_insert(session):
+    """Return the insert construct supporting ON CONFLICT for the session's dialect."""
+
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert
+    if dialect == "sqlite":
+        return sqlite.insert
+    raise HTTPException(status_code=501, detail=f"Upserts are not supported for the {dialect} dialect.")
+
+
+def upsert_objobssap_rows(session, rows: list[dict], batch_size: int = None) -> int:
+    """Insert or update ObjObsSAP rows keyed on (target, facility, window), one set-based statement per batch.
+
+    The caller is responsible for committing the session.
+    """
+
+    batch_size = batch_size or settings.INGEST_BATCH_SIZE
+    insert = dialect_insert(session)
+
+    # A single statement cannot update the same row twice, so the last occurrence of a window wins
+    unique_rows = list({tuple(row[key] for key in UPSERT_KEY): row for row in rows}.values())
+
+    for start in range(0, len(unique_rows), batch_size):
+        batch = unique_rows[start : start + batch_size]
+        stmt = insert(ObjObsSAPModel.__table__).values(batch)
+        update_columns = {name: stmt.excluded[name] for name in batch[0] if name not in UPSERT_KEY}
+        stmt = stmt.on_conflict_do_update(index_elements=UPSERT_KEY, set_=update_columns)
+        session.execute(stmt)
+
+    return len(unique_rows)
+
+
+def insert_missing_objobssap_rows(session, rows: list[dict], batch_size: int = None) -> int:
+    """Insert the ObjObsSAP rows whose (target, facility, window) is not stored yet, returning how many were.
+
+    Stored windows are left untouched. The caller is responsible for committing the session.
+    """
+
+    batch_size = batch_size or settings.INGEST_BATCH_SIZE
+    insert = dialect_insert(session)
+
+    rows = [{name: value for name, value in row.items() if name != "id"} for row in rows]
+    inserted = 0
+
+    for start in range(0, len(rows), batch_size):
+        stmt = insert(ObjObsSAPModel.__table__).values(rows[start : start + batch_size])
+        inserted += session.execute(stmt.on_conflict_do_nothing(index_elements=UPSERT_KEY)).rowcount
+
+    return inserted
+
+
+def bump_data_version(session) -> int:
+    """Increment the data version counter, returning the new version.
+
+    Creating and incrementing the counter is a single statement, so concurrent first bumps cannot conflict.
+    The caller is responsible for committing the session.
+    """
+
+    table = DataVersion.__table__
+    stmt = dialect_insert(session)(table).values(id=1, version=1)
+    stmt = stmt.on_conflict_do_update(index_elements=[table.c.id], set_={"version": table.c.version + 1})
+
+    return session.execute(stmt.returning(table.c.version)).scalar_one()
+
+
+def get_data_version(session) -> int:
+    """Return the current data version, for use as a cache key."""
+
+    data_version = session.get(DataVersion, 1)
+    return data_version.version if data_version else 0
+
+
+def upsert_routed_rows(session, rows: list[dict]) -> dict:
+    """Upsert rows, routing each facility's rows to its backend when one is configured.
+
+    Rows for the default database are upserted in the given session, which is committed along with the data version.
+    """
+
+    backend_rows = {}
+    for row in rows:
+        backend = row["facility"] if row["facility"] in FacilitySessions else None
+        backend_rows.setdefault(backend, []).append(row)
+
+    upserted = 0
+
+    for backend, rows_for_backend in backend_rows.items():
+        if backend is None:
+            upserted += upsert_objobssap_rows(session, rows_for_backend)
+            continue
+
+        with get_facility_db(backend) as facility_session:
+            upserted += upsert_objobssap_rows(facility_session, rows_for_backend)
+            facility_session.commit()
+
+    # An empty batch changes nothing
+    if not upserted:
+        return {"rows": 0, "data_version": get_data_version(session)}
+
+    version = bump_data_version(session)
+    session.commit()
+
+    return {"rows": upserted, "data_version": version}
+
+
+def ingest_objobssap_rows(content: bytes, content_type: str, db) -> dict:
+    """Read an ingested batch and upsert its rows."""
+
+    rows = table_to_objobssap_rows(read_ingest_table(content, content_type))
 
     with db as session:
-        query_obj = session.query(ObjObsSAPModel)
+        return upsert_routed_rows(session, rows)
+
 
-        # In real applications, POS filtering would most likely involve a more complex spatial query.
-        if pos:
-            query_obj = query_obj.filter(
-                ObjObsSAPModel.s_ra.between(pos.ra - 0.5, pos.ra + 0.5)
-                & ObjObsSAPModel.s_dec.between(pos.dec - 0.5, pos.dec + 0.5)
+def write_back_computed_rows(session, rows: list[dict]):
+    """Store the computed windows that are not stored yet, and fill in the ids of all of them.
+
+    The rows are stored in their facility's backend when one is configured. The data version is only bumped
+    when new windows were stored.
+    """
+
+    facility = rows[0]["facility"]
+    backend = get_facility_db(facility) if facility in FacilitySessions else nullcontext(session)
+
+    with backend as backend_session:
+        inserted = insert_missing_objobssap_rows(backend_session, rows)
+
+        # The computed rows of a query share their target and facility
+        stored = backend_session.execute(
+            select(ObjObsSAPModel.id, ObjObsSAPModel.t_start, ObjObsSAPModel.t_stop).where(
+                ObjObsSAPModel.target_name == rows[0]["target_name"],
+                ObjObsSAPModel.facility == facility,
+                ObjObsSAPModel.t_start >= min(row["t_start"] for row in rows),
+                ObjObsSAPModel.t_start <= max(row["t_start"] for row in rows),
             )
+        ).all()
+        backend_session.commit()
 
-        # The spec is somewhat ambiguous on how to handle the time range, so we take it here as to include the entire range.
-        if time:
-            query_obj = query_obj.filter(ObjObsSAPModel.t_start >= time.start, ObjObsSAPModel.t_stop <= time.end)
+    if inserted:
+        bump_data_version(session)
+        session.commit()
 
-        if min_obs is not None:
-            query_obj = query_obj.filter(ObjObsSAPModel.t_observability >= min_obs)
+    ids = {(t_start, t_stop): row_id for row_id, t_start, t_stop in stored}
+    for row in rows:
+        row["id"] = ids.get((row["t_start"], row["t_stop"]))
 
-        if facility:
-            query_obj = query_obj.filter(ObjObsSAPModel.facility == facility)
 
-        results = query_obj.all()
+def calculate_objobssap_rows(open_session, pos: PositionParameter, time: TimeParameter, min_obs: int) -> list[dict]:
+    """Compute the observability windows for a position on the fly, optionally writing them back to the database.
 
-        if len(results) > maxrec:
-            results = results[:maxrec]
-            overflow = True
+    open_session returns the default database session, it is only called to write the windows back.
 
-        results = [result.to_dict(as_str=False) for result in results]
+    Computed windows are kept in memory, so repeated queries for the same position and days are neither
+    recomputed nor written back again, even while a snapshot that does not hold them yet is served.
+    """
 
-        metadata = session.query(ObsMetadata).all()
-        metadata = [md.to_dict(as_str=False) for md in metadata]
+    if time:
+        start, end = time.start, time.end
+    else:
+        start = current_mjd()
+        end = start + settings.CALCULATOR_DEFAULT_DAYS
 
-    response = handle_response_format(results, metadata, response_format, overflow)
+    if end - start > settings.CALCULATOR_MAX_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"TIME ranges longer than {settings.CALCULATOR_MAX_DAYS} days cannot be calculated on the fly.",
+        )
 
-    return response
+    key = (pos.ra, pos.dec, start, end)
+    results = computed_windows.get(key)
+
+    if results is None:
+        try:
+            results = compute_observability(pos.ra, pos.dec, start, end)
+        except ValueError as exc:
+            # Raised by astropy when no usable IERS data is available for the requested times
+            logger.exception("Could not calculate observability windows")
+            reason = str(exc).splitlines()[0]
+            raise HTTPException(status_code=503, detail=f"Observability could not be calculated: {reason}")
+        if results and settings.CALCULATOR_WRITE_BACK:
+            write_back_computed_rows(open_session(), results)
+        computed_windows.put(key, results)
+
+    # Copies, so the cached rows cannot be changed by the caller
+    results = [dict(result) for result in results]
+
+    if min_obs is not None:
+        results = [result for result in results if result["t_observability"] >= min_obs]
+
+    return results
+
+
+def prune_expired_windows(batch_size: int = None) -> int:
+    """Delete rows whose t_validity has passed from every backend, in small batches.
+
+    Each batch is committed on its own so that pruning never holds long locks.
+    """
+
+    batch_size = batch_size or settings.PRUNE_BATCH_SIZE
+    today = current_mjd()
+
+    backends = [get_db] + [partial(get_facility_db, facility) for facility in FacilitySessions]
+    pruned = 0
+
+    for backend in backends:
+        while True:
+            with backend() as session:
+                expired = select(ObjObsSAPModel.id).where(ObjObsSAPModel.t_validity < today).limit(batch_size)
+                stmt = delete(ObjObsSAPModel).where(ObjObsSAPModel.id.in_(expired))
+                deleted = session.execute(stmt, execution_options={"synchronize_session": False}).rowcount
+                session.commit()
+
+            pruned += deleted
+            if deleted < batch_size:
+                break
+
+    if pruned:
+        with get_db() as session:
+            bump_data_version(session)
+            session.commit()
+        logger.info("Pruned %d expired observability windows", pruned)
+
+    return pruned
@@ -0,0 +1,124 @@
+"""Slow-query log for the ObjObsSAP service.
+
+Queries slower than SLOW_QUERY_THRESHOLD are logged as JSON to the ``fastapi_objobssap.slow_queries`` logger, with
+their normalized parameters, result size and stage timings. A sample of them is re-run in the background under
+``EXPLAIN (ANALYZE, BUFFERS)``, and the plans are appended to SLOW_QUERY_PLAN_FILE as JSON lines, so missing
+indexes and sequential scans can be spotted from production traffic.
+
+Queries that timed out or failed are only planned with a plain ``EXPLAIN``, so the most expensive queries are not
+run a second time. At most one capture runs at a time, and samples taken while one is running are dropped.
+"""
+
+import json
+import logging
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from fastapi_objobssap.cancellation import QueryScope
+from fastapi_objobssap.config.settings import get_settings
+from fastapi_objobssap.schemas import PositionParameter, TimeParameter
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger("fastapi_objobssap.slow_queries")
+
+settings = get_settings()
+
+# A single worker keeps plan captures from competing with each other for the database
+explain_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="objobssap-explain")
+
+# Held while a capture is queued or running
+capture_lock = threading.Lock()
+
+
+def normalize_parameters(
+    pos: PositionParameter, time: TimeParameter, min_obs: int, facility: str, maxrec: int, response_format: str
+) -> dict:
+    """Return the query parameters in a form that can be compared across requests."""
+    return {
+        "POS": [pos.ra, pos.dec],
+        "TIME": [time.start, time.end] if time else None,
+        "MINOBS": min_obs,
+        "FACILITY": facility,
+        "MAXREC": maxrec,
+        "RESPONSEFORMAT": str(response_format),
+    }
+
+
+def record_slow_query(parameters: dict, scope: QueryScope, error: Exception = None):
+    """Log the query if it exceeded the slow-query threshold, and sample it for a plan capture."""
+
+    threshold = settings.SLOW_QUERY_THRESHOLD
+    duration = scope.elapsed
+    if not threshold or duration < threshold:
+        return
+
+    # An abandoned worker thread may still be updating the scope
+    with scope.lock:
+        timings = dict(scope.timings)
+        statements = list(scope.statements)
+
+    entry = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "duration": round(duration, 4),
+        "parameters": parameters,
+        "rows": scope.row_count,
+        "overflow": scope.overflow,
+        "stages": {name: round(seconds, 4) for name, seconds in timings.items()},
+        "error": type(error).__name__ if error else None,
+    }
+    slow_query_logger.warning(json.dumps(entry))
+
+    if not statements or random.random() >= settings.SLOW_QUERY_EXPLAIN_RATE:
+        return
+
+    # Drop the sample rather than queue captures behind a running one
+    if not capture_lock.acquire(blocking=False):
+        return
+
+    try:
+        explain_executor.submit(capture_plans, entry, statements, analyze=error is None)
+    except Exception:
+        capture_lock.release()
+        raise
+
+
+def capture_plans(entry: dict, statements: list, analyze: bool = True):
+    """Plan the statements of a slow query and store the plans, releasing the capture lock when done.
+
+    With analyze, the statements are re-run under EXPLAIN (ANALYZE, BUFFERS), bounded by QUERY_TIMEOUT like the
+    original query. Only Postgres statements are explained.
+    """
+
+    try:
+        for bind, statement in statements:
+            capture_plan(entry, bind, statement, analyze)
+    finally:
+        capture_lock.release()
+
+
+def capture_plan(entry: dict, bind, statement, analyze: bool):
+    """Plan a single statement and append the plan to SLOW_QUERY_PLAN_FILE."""
+
+    if bind.dialect.name != "postgresql":
+        return
+
+    explain = "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)" if analyze else "EXPLAIN (FORMAT JSON)"
+    sql = str(statement.compile(dialect=bind.dialect, compile_kwargs={"literal_binds": True}))
+
+    try:
+        with bind.connect() as connection:
+            if analyze and settings.QUERY_TIMEOUT:
+                connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(settings.QUERY_TIMEOUT * 1000)}")
+            plan = connection.exec_driver_sql(f"{explain} {sql}").scalar()
+            connection.rollback()
+    except Exception:  # pylint: disable=broad-except
+        logger.warning("Could not capture the plan of a slow query", exc_info=True)
+        return
+
+    line = json.dumps({**entry, "database": bind.url.database, "analyze": analyze, "statement": sql, "plan": plan})
+
+    # A single unbuffered append per line, so lines from several workers writing to the file do not interleave
+    with open(settings.SLOW_QUERY_PLAN_FILE, "ab", buffering=0) as plan_file:
+        plan_file.write(f"{line}\n".encode("utf-8"))
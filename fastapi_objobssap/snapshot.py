@@ -0,0 +1,213 @@
+"""Memory-mapped columnar snapshots of the ObjObsSAP table.
+
+A snapshot is a directory holding one ``.npy`` file per column of the ObjObsSAPModel, with the rows sorted by s_ra
+so that the RA constraint of a query is a binary search, and a ``manifest.json`` with the row count, data version
+and column metadata. Every worker maps the same files read-only, so the data lives once in the page cache no matter
+how many workers a host runs.
+
+Snapshots are exported into ``SNAPSHOT_DIR/versions/<version>`` and published by atomically replacing the
+``SNAPSHOT_DIR/current`` symlink. Workers pick up a new snapshot on their next query, while queries already running
+keep reading the mapping they started with.
+"""
+
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import Float, Integer, select
+
+from fastapi_objobssap.config.settings import get_settings
+from fastapi_objobssap.models import DataVersion, ObjObsSAPModel, ObsMetadata
+from fastapi_objobssap.schemas import PositionParameter, TimeParameter
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+MANIFEST_FILE = "manifest.json"
+CURRENT_LINK = "current"
+VERSIONS_DIR = "versions"
+
+
+def column_dtype(column) -> str:
+    """Return the NumPy dtype used to store a model column, or None for string columns sized from the data."""
+    if isinstance(column.type, Integer):
+        return "int64"
+    if isinstance(column.type, Float):
+        return "float64"
+    return None
+
+
+def export_snapshot(session, snapshot_dir: str = None, keep: int = None) -> str:
+    """Export the ObjObsSAP table to a new snapshot version and publish it, returning its path.
+
+    NULL floats are stored as NaN and NULL strings as empty strings.
+    """
+
+    snapshot_dir = snapshot_dir or settings.SNAPSHOT_DIR
+    keep = keep or settings.SNAPSHOT_KEEP
+
+    columns = list(ObjObsSAPModel.__table__.columns)
+    rows = session.execute(select(*columns).order_by(ObjObsSAPModel.s_ra)).all()
+    data_version = session.get(DataVersion, 1)
+    metadata = [md.to_dict(as_str=False) for md in session.query(ObsMetadata).all()]
+
+    versions_dir = os.path.join(snapshot_dir, VERSIONS_DIR)
+    os.makedirs(versions_dir, exist_ok=True)
+
+    # Named by publish time first, so versions sort in publish order even if the data version goes backwards
+    version = f"{time.time_ns():020d}-{data_version.version if data_version else 0:010d}"
+    staging_path = os.path.join(versions_dir, f".{version}.tmp")
+    os.makedirs(staging_path)
+
+    for index, column in enumerate(columns):
+        values = [row[index] for row in rows]
+        dtype = column_dtype(column)
+        if dtype == "float64":
+            values = [np.nan if value is None else value for value in values]
+        elif dtype is None:
+            values = ["" if value is None else value for value in values]
+            dtype = f"U{max((len(value) for value in values), default=1) or 1}"
+        np.save(os.path.join(staging_path, f"{column.name}.npy"), np.asarray(values, dtype=dtype))
+
+    manifest = {
+        "version": version,
+        "data_version": data_version.version if data_version else 0,
+        "rows": len(rows),
+        "columns": [column.name for column in columns],
+        "metadata": metadata,
+    }
+    with open(os.path.join(staging_path, MANIFEST_FILE), "w", encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file)
+
+    # Publish: move the finished directory into place, then swap the symlink
+    version_path = os.path.join(versions_dir, version)
+    os.rename(staging_path, version_path)
+
+    staging_link = os.path.join(snapshot_dir, f".{CURRENT_LINK}.tmp")
+    if os.path.lexists(staging_link):
+        os.remove(staging_link)
+    os.symlink(os.path.join(VERSIONS_DIR, version), staging_link)
+    os.replace(staging_link, os.path.join(snapshot_dir, CURRENT_LINK))
+
+    # Old versions can be removed safely, workers still mapping them keep their pages until they swap
+    published = sorted(name for name in os.listdir(versions_dir) if not name.startswith(".") and name != version)
+    for name in published[: max(0, len(published) - keep + 1)]:
+        shutil.rmtree(os.path.join(versions_dir, name), ignore_errors=True)
+
+    logger.info("Published snapshot %s with %d rows", version, len(rows))
+
+    return version_path
+
+
+class Snapshot:
+    """A read-only, memory-mapped snapshot version."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+        with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+
+        self.version = manifest["version"]
+        self.data_version = manifest["data_version"]
+        self.metadata = manifest["metadata"]
+        self.columns = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in manifest["columns"]
+        }
+
+    def query(
+        self,
+        pos: PositionParameter,
+        time: TimeParameter,
+        min_obs: int,
+        facility: str,
+        maxrec: int,
+        exclude_facilities: list[str] = None,
+        ordered: bool = False,
+    ) -> list[dict]:
+        """Run the ObjObsSAP query against the snapshot, returning at most maxrec + 1 rows.
+
+        The constraints match those of services.build_objobssap_query. With ordered, the earliest windows are
+        returned, ordered by (t_start, id).
+        """
+
+        s_ra = self.columns["s_ra"]
+
+        # Rows are sorted by s_ra, so the RA constraint is a contiguous slice
+        lower = np.searchsorted(s_ra, pos.ra - 0.5, side="left")
+        upper = np.searchsorted(s_ra, pos.ra + 0.5, side="right")
+
+        s_dec = self.columns["s_dec"][lower:upper]
+        mask = (s_dec >= pos.dec - 0.5) & (s_dec <= pos.dec + 0.5)
+
+        if time:
+            mask &= self.columns["t_start"][lower:upper] >= time.start
+            mask &= self.columns["t_stop"][lower:upper] <= time.end
+
+        if min_obs is not None:
+            mask &= self.columns["t_observability"][lower:upper] >= min_obs
+
+        if facility:
+            mask &= self.columns["facility"][lower:upper] == facility
+
+        if exclude_facilities:
+            mask &= ~np.isin(self.columns["facility"][lower:upper], exclude_facilities)
+
+        indices = lower + np.flatnonzero(mask)
+
+        if ordered:
+            indices = indices[np.lexsort((self.columns["id"][indices], self.columns["t_start"][indices]))]
+
+        indices = indices[: maxrec + 1]
+
+        results = []
+        for index in indices:
+            result = {}
+            for name, values in self.columns.items():
+                value = values[index].item()
+                # Restore the NULLs stored as NaN or empty strings
+                if value == "" or (isinstance(value, float) and np.isnan(value)):
+                    value = None
+                result[name] = value
+            results.append(result)
+
+        return results
+
+
+class SnapshotStore:
+    """Tracks the current snapshot of a snapshot directory, swapping in new versions as they are published."""
+
+    def __init__(self, snapshot_dir: str):
+        self.current_link = os.path.join(snapshot_dir, CURRENT_LINK)
+        self.snapshot = None
+        self.lock = threading.Lock()
+
+    def get(self) -> Snapshot | None:
+        """Return the current snapshot, or None if none has been published yet."""
+
+        try:
+            path = os.path.realpath(self.current_link, strict=True)
+        except OSError:
+            return self.snapshot
+
+        if self.snapshot is not None and self.snapshot.path == path:
+            return self.snapshot
+
+        with self.lock:
+            if self.snapshot is None or self.snapshot.path != path:
+                try:
+                    self.snapshot = Snapshot(path)
+                    logger.info("Mapped snapshot %s", self.snapshot.version)
+                except OSError:
+                    # The version was pruned between resolving the link and opening it, keep the current one
+                    logger.warning("Could not map snapshot %s", path, exc_info=True)
+
+        return self.snapshot
+
+
+snapshot_store = SnapshotStore(settings.SNAPSHOT_DIR) if settings.SNAPSHOT_DIR else None
@@ -0,0 +1,24 @@
+"""Background tasks for the ObjObsSAP service."""
+
+import asyncio
+import logging
+
+from fastapi.concurrency import run_in_threadpool
+
+from fastapi_objobssap.config.settings import get_settings
+from fastapi_objobssap.services import prune_expired_windows
+
+logger = logging.getLogger(__name__)
+
+
+async def prune_expired_windows_periodically():
+    """Prune expired observability windows every PRUNE_INTERVAL seconds."""
+
+    interval = get_settings().PRUNE_INTERVAL
+
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(prune_expired_windows)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Pruning expired observability windows failed")
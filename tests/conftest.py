@@ -0,0 +1,77 @@
+"""Test configuration for FastAPI ObjObsSAP.
+
+The settings and engines are created when the package is imported, so the environment pointing the default
+database and three facility backends at temporary SQLite files is set up before any test module imports it.
+"""
+
+import io
+import json
+import os
+import tempfile
+
+DATABASE_DIR = tempfile.mkdtemp(prefix="objobssap-tests-")
+FACILITIES = ["HST", "VLT", "JWST"]
+
+os.environ["POSTGRES_DATABASE_URL"] = f"sqlite:///{DATABASE_DIR}/default.db"
+os.environ["FACILITY_DATABASE_URLS"] = json.dumps(
+    {facility: f"sqlite:///{DATABASE_DIR}/{facility.lower()}.db" for facility in FACILITIES}
+)
+
+import pytest  # noqa: E402
+from astropy.io.votable import parse  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from fastapi_objobssap.config.database import engine, facility_engines  # noqa: E402
+from fastapi_objobssap.main import app  # noqa: E402
+from fastapi_objobssap.models import Base  # noqa: E402
+
+
+def make_row(facility: str, t_start: int, target_name: str = "Target_1", s_ra: float = 10.0, s_dec: float = 10.0):
+    """Build a complete ObjObsSAP row for one day-long window."""
+    return {
+        "t_validity": t_start + 365,
+        "t_start": t_start,
+        "t_stop": t_start + 1,
+        "t_observability": 86400.0,
+        "validity_accuracy": "HIGH",
+        "validity_predictor": "Predictor_1",
+        "pos_angle": 1.0,
+        "em_threshold": 1.0,
+        "target_name": target_name,
+        "em_min": 1.0,
+        "em_max": 2.0,
+        "elevation_min": 10.0,
+        "elevation_max": 80.0,
+        "moon_sep_min": 20.0,
+        "moon_sep_max": 40.0,
+        "sun_sep_min": 60.0,
+        "sun_sep_max": 90.0,
+        "facility": facility,
+        "s_ra": s_ra,
+        "s_dec": s_dec,
+    }
+
+
+def parse_votable(response):
+    """Parse a VOTable response."""
+    return parse(io.BytesIO(response.content))
+
+
+@pytest.fixture(autouse=True)
+def clean_databases():
+    """Empty every table of the default database and facility backends before each test."""
+    for each_engine in [engine, *facility_engines.values()]:
+        with each_engine.begin() as connection:
+            for table in reversed(Base.metadata.sorted_tables):
+                connection.execute(table.delete())
+    yield
+
+
+@pytest.fixture
+def client():
+    """A test client for the application.
+
+    Used as a context manager so its event loop outlives single requests, like a server's would.
+    """
+    with TestClient(app) as test_client:
+        yield test_client
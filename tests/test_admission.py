@@ -0,0 +1,111 @@
+"""Tests for the admission control in front of /query."""
+
+import asyncio
+import time
+
+import pytest
+
+from fastapi_objobssap.admission import AdmissionController
+from fastapi_objobssap.config.settings import get_settings
+from fastapi_objobssap.exceptions import ServiceOverloadedError
+from fastapi_objobssap.router import objobssap_router
+from tests.conftest import parse_votable
+
+
+def make_controller(max_concurrent=1, max_heavy=1, max_queue=1, queue_timeout=0.1):
+    """An admission controller with small limits."""
+    return AdmissionController(max_concurrent, max_heavy, max_queue, queue_timeout, retry_after=7)
+
+
+def test_queue_timeout_rejects_and_counts():
+    controller = make_controller()
+
+    async def scenario():
+        await controller.acquire()
+        with pytest.raises(ServiceOverloadedError):
+            await controller.acquire()
+        assert controller.queued == 0
+
+    asyncio.run(scenario())
+
+    assert controller.rejected == {"queue_full": 0, "queue_timeout": 1}
+    assert controller.in_flight == 1
+
+
+def test_queue_full_rejects_and_counts():
+    controller = make_controller(queue_timeout=1.0)
+
+    async def scenario():
+        await controller.acquire()
+        waiting = asyncio.ensure_future(controller.acquire())
+        await asyncio.sleep(0.01)
+        assert controller.queued == 1
+
+        with pytest.raises(ServiceOverloadedError):
+            await controller.acquire()
+
+        controller.release()
+        await waiting
+
+    asyncio.run(scenario())
+
+    assert controller.rejected == {"queue_full": 1, "queue_timeout": 0}
+    assert controller.admitted == 2
+
+
+def test_heavy_queries_have_their_own_limit():
+    controller = make_controller(max_concurrent=2, max_heavy=1, queue_timeout=0.05)
+
+    async def scenario():
+        await controller.acquire(heavy=True)
+        with pytest.raises(ServiceOverloadedError):
+            await controller.acquire(heavy=True)
+        # A light query still gets the remaining slot
+        await controller.acquire()
+
+    asyncio.run(scenario())
+
+    assert controller.heavy_in_flight == 1
+    assert controller.in_flight == 2
+
+
+def test_overload_returns_503_with_retry_after(client, monkeypatch):
+    controller = make_controller(max_queue=0)
+    asyncio.run(controller.acquire())
+    monkeypatch.setattr(objobssap_router, "admission_controller", controller)
+
+    response = client.get("/query", params={"POS": "10,10", "TIME": "60000/60010"})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "7"
+    assert "overloaded" in {info.name: info.value for info in parse_votable(response).infos}["Error"]
+    assert controller.rejected["queue_full"] == 1
+
+
+def test_slot_held_until_abandoned_work_finishes(client, monkeypatch):
+    controller = make_controller()
+    monkeypatch.setattr(objobssap_router, "admission_controller", controller)
+    monkeypatch.setattr(get_settings(), "QUERY_TIMEOUT", 0.1)
+
+    def stuck_operation(scope, **kwargs):  # pylint: disable=unused-argument
+        # Ignores the cancellation, like a statement that cannot be interrupted
+        time.sleep(0.5)
+
+    monkeypatch.setattr(objobssap_router, "perform_objobssap_operation", stuck_operation)
+
+    response = client.get("/query", params={"POS": "10,10", "TIME": "60000/60010"})
+    assert response.status_code == 504
+    assert controller.in_flight == 1
+
+    time.sleep(0.8)
+    assert controller.in_flight == 0
+
+
+def test_metrics_endpoint(client, monkeypatch):
+    controller = make_controller()
+    monkeypatch.setattr("fastapi_objobssap.router.metrics.admission_controller", controller)
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert 'objobssap_admission_rejected_total{reason="queue_full"} 0' in response.text
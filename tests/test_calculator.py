@@ -0,0 +1,157 @@
+"""Tests for the on-the-fly observability calculator and its use in the query path."""
+
+import astropy.units as u
+import numpy as np
+import pytest
+from astropy.coordinates import AltAz, SkyCoord, get_body
+from astropy.time import Time
+
+from fastapi_objobssap import calculator, services
+from fastapi_objobssap.calculator import LRUCache, compute_ephemeris, compute_observability, facility_location
+from fastapi_objobssap.config.database import FacilitySessions, get_db
+from fastapi_objobssap.models import ObjObsSAPModel
+from fastapi_objobssap.services import get_data_version
+from tests.conftest import make_row, parse_votable
+
+QUERY = {"POS": "10,10", "TIME": "60000/60002", "FACILITY": "VLT"}
+
+
+@pytest.fixture
+def stub_calculator(monkeypatch):
+    """Enable the calculator with write-back, computing fixed windows instead of ephemerides."""
+
+    calls = []
+
+    def compute_observability(ra, dec, start, end):
+        calls.append((ra, dec, start, end))
+        rows = []
+        for t_start in range(start, end):
+            row = make_row("VLT", t_start, target_name=f"{ra:.6f},{dec:.6f}", s_ra=ra, s_dec=dec)
+            rows.append({"id": None, **row, "pos_angle": None, "em_threshold": None, "em_min": None, "em_max": None})
+        return rows
+
+    monkeypatch.setattr(services, "compute_observability", compute_observability)
+    monkeypatch.setattr(services, "computed_windows", LRUCache(16))
+    monkeypatch.setattr(services.settings, "CALCULATOR_ENABLED", True)
+    monkeypatch.setattr(services.settings, "CALCULATOR_WRITE_BACK", True)
+    monkeypatch.setattr(services.settings, "CALCULATOR_FACILITY", "VLT")
+
+    return calls
+
+
+def data_version() -> int:
+    """Return the data version of the default database."""
+    with get_db() as session:
+        return get_data_version(session)
+
+
+def test_computed_rows_written_back_with_ids(client, stub_calculator):
+    response = client.get("/query", params=QUERY)
+
+    table = parse_votable(response).get_first_table().to_table()
+    assert list(table["t_start"]) == [60000, 60001]
+    assert table["pos_angle"].mask.all()
+
+    with FacilitySessions["VLT"]() as session:
+        stored = {row.t_start: row.id for row in session.query(ObjObsSAPModel).all()}
+
+    assert [stored[t_start] for t_start in table["t_start"]] == list(table["id"])
+    assert data_version() == 1
+
+
+def test_repeated_query_not_recomputed_or_written_again(client, stub_calculator, monkeypatch):
+    client.get("/query", params=QUERY)
+
+    # Like a snapshot that does not hold the computed rows yet
+    monkeypatch.setattr(services, "query_objobssap_rows", lambda *args, **kwargs: [])
+    client.get("/query", params=QUERY)
+
+    assert len(stub_calculator) == 1
+    assert data_version() == 1
+
+
+def test_write_back_leaves_stored_windows(stub_calculator):
+    rows = services.compute_observability(10.0, 10.0, 60000, 60002)
+    recomputed = services.compute_observability(10.0, 10.0, 60000, 60002)
+    recomputed[0]["t_observability"] = 1.0
+
+    with get_db() as session:
+        services.write_back_computed_rows(session, rows)
+        services.write_back_computed_rows(session, recomputed)
+
+    with FacilitySessions["VLT"]() as session:
+        assert [row.t_observability for row in session.query(ObjObsSAPModel).all()] == [86400.0, 86400.0]
+
+    assert [row["id"] for row in recomputed] == [row["id"] for row in rows]
+    assert data_version() == 1
+
+
+def test_missing_iers_data_returns_votable_error(client, stub_calculator, monkeypatch):
+    def compute_observability(ra, dec, start, end):
+        raise ValueError("interpolating from IERS_Auto using predictive values that are more\nthan 30.0 days old.")
+
+    monkeypatch.setattr(services, "compute_observability", compute_observability)
+
+    response = client.get("/query", params=QUERY)
+
+    assert response.status_code == 503
+    assert "Observability could not be calculated: interpolating from IERS_Auto" in response.text
+
+
+def test_observability_matches_astropy():
+    """One target over one night, against astropy AltAz coordinates.
+
+    Elevations ignore precession, which is off by up to about 0.3 degrees, so angles are compared within 0.5 degrees
+    and the observable time within two grid steps, one for each end of the night.
+    """
+
+    ra, dec, day = 60.0, -30.0, 61000
+    step = services.settings.CALCULATOR_TIME_STEP
+
+    [row] = compute_observability(ra, dec, day, day + 1)
+
+    times = Time(day + np.arange(86400 // step) * step / 86400, format="mjd", scale="utc")
+    frame = AltAz(obstime=times, location=facility_location())
+    target = SkyCoord(ra=ra * u.deg, dec=dec * u.deg).transform_to(frame)
+    sun = get_body("sun", times, facility_location()).transform_to(frame)
+    moon = get_body("moon", times, facility_location()).transform_to(frame)
+
+    elevation = target.alt.deg
+    sun_sep = target.separation(sun).deg
+    moon_sep = target.separation(moon).deg
+    observable = (
+        (elevation >= services.settings.CALCULATOR_MIN_ELEVATION)
+        & (sun_sep >= services.settings.CALCULATOR_MIN_SUN_SEP)
+        & (moon_sep >= services.settings.CALCULATOR_MIN_MOON_SEP)
+    )
+
+    assert (row["t_start"], row["t_stop"]) == (day, day + 1)
+    assert abs(row["t_observability"] - observable.sum() * step) <= 2 * step
+    for name, values in [("elevation", elevation), ("sun_sep", sun_sep), ("moon_sep", moon_sep)]:
+        assert row[f"{name}_min"] == pytest.approx(values[observable].min(), abs=0.5)
+        assert row[f"{name}_max"] == pytest.approx(values[observable].max(), abs=0.5)
+
+
+def test_overlapping_ranges_only_compute_new_days(monkeypatch):
+    compute_days = calculator.compute_days
+    computed = []
+
+    def recording_compute_days(start, end, step):
+        computed.append((start, end))
+        return compute_days(start, end, step)
+
+    monkeypatch.setattr(calculator, "compute_days", recording_compute_days)
+    monkeypatch.setattr(calculator, "ephemeris_cache", LRUCache(16))
+
+    compute_ephemeris(61000, 61003, 3600)
+    compute_ephemeris(61004, 61005, 3600)
+    ephemeris = compute_ephemeris(60999, 61006, 3600)
+
+    # Only the runs of days missing from the cache are computed
+    assert computed == [(61000, 61003), (61004, 61005), (60999, 61000), (61003, 61004), (61005, 61006)]
+
+    direct = compute_days(60999, 61006, 3600)
+    assert list(ephemeris.days) == list(range(60999, 61006))
+    assert np.allclose(ephemeris.sun, np.concatenate([day.sun for day in direct], axis=1))
+    assert np.allclose(ephemeris.moon, np.concatenate([day.moon for day in direct], axis=1))
+    assert np.allclose(ephemeris.local_sidereal_time, np.concatenate([day.local_sidereal_time for day in direct]))
@@ -0,0 +1,76 @@
+"""Tests for the per-query deadlines and cancellation."""
+
+import threading
+import time
+
+import pytest
+from sqlalchemy import text
+
+from fastapi_objobssap.cancellation import QueryScope
+from fastapi_objobssap.config.database import get_db
+from fastapi_objobssap.config.settings import get_settings
+from fastapi_objobssap.exceptions import ClientDisconnectedError, QueryTimeoutError
+from fastapi_objobssap.router import objobssap_router
+from fastapi_objobssap.schemas import PositionParameter
+from fastapi_objobssap.services import query_objobssap_rows
+from tests.conftest import parse_votable
+
+# Never finishes on its own
+ENDLESS_QUERY = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT count(*) FROM c"
+
+
+def test_connection_detached_after_query():
+    scope = QueryScope(timeout=10)
+
+    with get_db() as session:
+        query_objobssap_rows(session, PositionParameter(ra=10, dec=10), None, None, None, 10, scope=scope)
+
+    assert scope.connections == []
+
+
+def test_cancel_interrupts_running_statement():
+    scope = QueryScope()
+    errors = []
+
+    def run():
+        with get_db() as session:
+            try:
+                with scope.attach(session), scope.guard():
+                    session.execute(text(ENDLESS_QUERY))
+            except Exception as exc:  # pylint: disable=broad-except
+                errors.append(exc)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    time.sleep(0.2)
+    scope.cancel(disconnected=True)
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert isinstance(errors[0], ClientDisconnectedError)
+    assert scope.connections == []
+
+
+def test_check_raises_after_deadline():
+    scope = QueryScope(timeout=0.01)
+    time.sleep(0.02)
+
+    with pytest.raises(QueryTimeoutError):
+        scope.check()
+
+
+def test_deadline_returns_votable_504(client, monkeypatch):
+    monkeypatch.setattr(get_settings(), "QUERY_TIMEOUT", 0.3)
+
+    def slow_operation(scope, **kwargs):  # pylint: disable=unused-argument
+        while True:
+            scope.check()
+            time.sleep(0.01)
+
+    monkeypatch.setattr(objobssap_router, "perform_objobssap_operation", slow_operation)
+
+    response = client.get("/query", params={"POS": "10,10", "TIME": "60000/60010"})
+
+    assert response.status_code == 504
+    infos = {info.name: info.value for info in parse_votable(response).infos}
+    assert "time limit" in infos["Error"]
@@ -0,0 +1,141 @@
+"""Tests for the federated facility backends."""
+
+import threading
+
+from sqlalchemy import text
+
+from fastapi_objobssap import services
+from fastapi_objobssap.config.database import FacilitySessions, get_db, get_facility_db
+from fastapi_objobssap.services import upsert_objobssap_rows
+from tests.conftest import make_row, parse_votable
+from tests.test_cancellation import ENDLESS_QUERY
+
+QUERY = {"POS": "10,10", "TIME": "60000/60100"}
+
+
+def store_rows(facility: str, rows: list[dict]):
+    """Store rows in a facility backend."""
+    with FacilitySessions[facility]() as session:
+        upsert_objobssap_rows(session, rows)
+        session.commit()
+
+
+def result_rows(response) -> list[tuple]:
+    """Return the (facility, t_start) of each row of a VOTable response."""
+    table = parse_votable(response).get_first_table().to_table()
+    return [(str(row["facility"]), int(row["t_start"])) for row in table]
+
+
+def votable_infos(response) -> dict:
+    """Return the INFO elements of a VOTable response by name."""
+    return {info.name: info.value for info in parse_votable(response).infos}
+
+
+def test_facility_routed_to_its_backend(client):
+    store_rows("HST", [make_row("HST", 60001)])
+    store_rows("VLT", [make_row("VLT", 60002)])
+
+    response = client.get("/query", params={**QUERY, "FACILITY": "VLT"})
+
+    assert response.status_code == 200
+    assert result_rows(response) == [("VLT", 60002)]
+
+
+def test_fan_out_merges_by_window_start(client):
+    store_rows("HST", [make_row("HST", 60001), make_row("HST", 60004)])
+    store_rows("VLT", [make_row("VLT", 60002)])
+    store_rows("JWST", [make_row("JWST", 60003)])
+
+    response = client.get("/query", params=QUERY)
+
+    assert result_rows(response) == [("HST", 60001), ("VLT", 60002), ("JWST", 60003), ("HST", 60004)]
+    assert "WARNING" not in votable_infos(response)
+
+
+def test_fan_out_truncates_to_maxrec_across_backends(client):
+    store_rows("HST", [make_row("HST", 60001), make_row("HST", 60003)])
+    store_rows("VLT", [make_row("VLT", 60002), make_row("VLT", 60004)])
+
+    response = client.get("/query", params={**QUERY, "MAXREC": 3})
+
+    assert result_rows(response) == [("HST", 60001), ("VLT", 60002), ("HST", 60003)]
+    assert votable_infos(response)["QUERY_STATUS"] == "OVERFLOW"
+
+
+def test_overflow_of_a_single_backend(client):
+    store_rows("HST", [make_row("HST", 60001), make_row("HST", 60002), make_row("HST", 60003)])
+
+    response = client.get("/query", params={**QUERY, "MAXREC": 2})
+
+    assert result_rows(response) == [("HST", 60001), ("HST", 60002)]
+    assert votable_infos(response)["QUERY_STATUS"] == "OVERFLOW"
+
+
+def test_fan_out_includes_default_database(client):
+    store_rows("HST", [make_row("HST", 60001)])
+
+    # Facilities without a backend are stored in the default database, stray rows of mapped ones are left out
+    with get_db() as session:
+        upsert_objobssap_rows(session, [make_row("ALMA", 60002), make_row("HST", 60003)])
+        session.commit()
+
+    response = client.get("/query", params=QUERY)
+
+    assert result_rows(response) == [("HST", 60001), ("ALMA", 60002)]
+
+
+def test_shared_backend_not_merged_twice(client, monkeypatch):
+    # JWST served from the HST database
+    monkeypatch.setitem(FacilitySessions, "JWST", FacilitySessions["HST"])
+    store_rows("HST", [make_row("HST", 60001), make_row("JWST", 60002)])
+    store_rows("VLT", [make_row("VLT", 60003), make_row("HST", 60004)])
+
+    response = client.get("/query", params=QUERY)
+
+    assert result_rows(response) == [("HST", 60001), ("JWST", 60002), ("VLT", 60003)]
+
+
+def test_dropped_backend_reported(client, monkeypatch):
+    store_rows("HST", [make_row("HST", 60001)])
+    store_rows("VLT", [make_row("VLT", 60002)])
+
+    query_facility_backend = services.query_facility_backend
+
+    def failing_backend(facility, *args):
+        if facility == "VLT":
+            raise ConnectionError("backend unavailable")
+        return query_facility_backend(facility, *args)
+
+    monkeypatch.setattr(services, "query_facility_backend", failing_backend)
+
+    response = client.get("/query", params=QUERY)
+
+    assert response.status_code == 200
+    assert result_rows(response) == [("HST", 60001)]
+    assert votable_infos(response)["WARNING"] == "Results are incomplete, no response from: VLT"
+
+
+def test_hung_backend_cancelled(client, monkeypatch):
+    store_rows("HST", [make_row("HST", 60001)])
+
+    query_facility_backend = services.query_facility_backend
+    interrupted = threading.Event()
+
+    def hung_backend(facility, pos, time, min_obs, maxrec, scope):
+        if facility != "JWST":
+            return query_facility_backend(facility, pos, time, min_obs, maxrec, scope)
+        with get_facility_db(facility) as session:
+            try:
+                with scope.attach(session), scope.guard():
+                    session.execute(text(ENDLESS_QUERY))
+            finally:
+                interrupted.set()
+
+    monkeypatch.setattr(services, "query_facility_backend", hung_backend)
+    monkeypatch.setattr(services.settings, "FACILITY_QUERY_TIMEOUT", 0.2)
+
+    response = client.get("/query", params=QUERY)
+
+    assert result_rows(response) == [("HST", 60001)]
+    assert votable_infos(response)["WARNING"] == "Results are incomplete, no response from: JWST"
+    assert interrupted.wait(timeout=5)
@@ -0,0 +1,184 @@
+"""Tests for the bulk ingest endpoint."""
+
+import io
+from types import SimpleNamespace
+
+import pytest
+from astropy.table import Table
+from fastapi import HTTPException
+
+from fastapi_objobssap.config.database import FacilitySessions, get_db
+from fastapi_objobssap.config.settings import get_settings
+from fastapi_objobssap.models import ObjObsSAPModel
+from fastapi_objobssap.services import (
+    bump_data_version,
+    dialect_insert,
+    get_data_version,
+    prune_expired_windows,
+    upsert_objobssap_rows,
+)
+from tests.conftest import make_row
+
+API_KEY = "test-key"
+
+
+@pytest.fixture(autouse=True)
+def ingest_enabled(monkeypatch):
+    """Enable ingest with a known API key."""
+    monkeypatch.setattr(get_settings(), "INGEST_API_KEY", API_KEY)
+
+
+def csv_batch(rows: list[dict]) -> bytes:
+    """Write rows as a CSV batch."""
+    batch = io.StringIO()
+    Table(rows=rows).write(batch, format="ascii.csv")
+    return batch.getvalue().encode("utf-8")
+
+
+def post_batch(client, content: bytes):
+    """Post a CSV batch to the ingest endpoint."""
+    return client.post("/ingest", content=content, headers={"X-API-Key": API_KEY, "Content-Type": "text/csv"})
+
+
+def test_ingest_routes_rows_to_facility_backends(client):
+    response = post_batch(client, csv_batch([make_row("HST", 60001), make_row("VLT", 60002)]))
+
+    assert response.status_code == 200
+
+    with FacilitySessions["VLT"]() as session:
+        assert [row.t_start for row in session.query(ObjObsSAPModel).all()] == [60002]
+
+
+def test_ingest_rejects_oversized_body(client, monkeypatch):
+    content = csv_batch([make_row("HST", 60001)])
+    monkeypatch.setattr(get_settings(), "INGEST_MAX_BYTES", len(content) - 1)
+
+    response = post_batch(client, content)
+
+    assert response.status_code == 413
+
+    with FacilitySessions["HST"]() as session:
+        assert session.query(ObjObsSAPModel).count() == 0
+
+
+def test_ingest_rejects_oversized_stream(client, monkeypatch):
+    content = csv_batch([make_row("HST", 60001)])
+    monkeypatch.setattr(get_settings(), "INGEST_MAX_BYTES", len(content) - 1)
+
+    # A generator body is sent chunked, without a Content-Length
+    response = client.post(
+        "/ingest", content=iter([content]), headers={"X-API-Key": API_KEY, "Content-Type": "text/csv"}
+    )
+
+    assert response.status_code == 413
+
+
+def test_ingest_body_not_read_as_path(client, tmp_path):
+    server_file = tmp_path / "windows.csv"
+    server_file.write_bytes(csv_batch([make_row("HST", 60001)]))
+
+    response = post_batch(client, str(server_file).encode("utf-8"))
+
+    assert response.status_code == 400
+
+    with FacilitySessions["HST"]() as session:
+        assert session.query(ObjObsSAPModel).count() == 0
+
+
+def test_ingest_empty_batch(client):
+    response = post_batch(client, b"")
+
+    assert response.status_code == 400
+    assert "Missing required columns" in response.text
+
+
+def test_ingest_header_only_batch(client):
+    header = csv_batch([make_row("HST", 60001)]).split(b"\n")[0] + b"\n"
+
+    response = post_batch(client, header)
+
+    assert response.status_code == 200
+    assert response.json() == {"rows": 0, "data_version": 0}
+
+
+def test_data_version_created_and_bumped_in_one_statement():
+    with get_db() as session:
+        assert bump_data_version(session) == 1
+        assert bump_data_version(session) == 2
+        session.commit()
+
+    with get_db() as session:
+        assert get_data_version(session) == 2
+
+
+def test_ingest_updates_existing_window(client):
+    post_batch(client, csv_batch([make_row("HST", 60001)]))
+
+    updated = {**make_row("HST", 60001), "t_observability": 3600.0}
+    response = post_batch(client, csv_batch([updated, make_row("HST", 60002)]))
+
+    assert response.json() == {"rows": 2, "data_version": 2}
+
+    with FacilitySessions["HST"]() as session:
+        stored = {row.t_start: row.t_observability for row in session.query(ObjObsSAPModel).all()}
+
+    assert stored == {60001: 3600.0, 60002: 86400.0}
+
+
+def test_ingest_requires_valid_key(client):
+    response = client.post("/ingest", content=b"", headers={"X-API-Key": "wrong-key", "Content-Type": "text/csv"})
+
+    assert response.status_code == 401
+
+
+def test_ingest_disabled_without_key(client, monkeypatch):
+    monkeypatch.setattr(get_settings(), "INGEST_API_KEY", None)
+
+    response = post_batch(client, csv_batch([make_row("HST", 60001)]))
+
+    assert response.status_code == 403
+
+
+def test_ingest_rejects_unsupported_content_type(client):
+    response = client.post(
+        "/ingest", content=b"{}", headers={"X-API-Key": API_KEY, "Content-Type": "application/json"}
+    )
+
+    assert response.status_code == 415
+
+
+def test_upserts_unsupported_for_other_dialects():
+    session = SimpleNamespace(get_bind=lambda: SimpleNamespace(dialect=SimpleNamespace(name="mysql")))
+
+    with pytest.raises(HTTPException) as exc_info:
+        dialect_insert(session)
+
+    assert exc_info.value.status_code == 501
+
+
+def test_prune_expired_windows_across_backends():
+    expired = [make_row("HST", 40000 + day) for day in range(3)]
+    valid = {**make_row("HST", 90000), "t_validity": 90001}
+
+    with FacilitySessions["HST"]() as session:
+        upsert_objobssap_rows(session, [*expired, valid])
+        session.commit()
+
+    with get_db() as session:
+        upsert_objobssap_rows(session, [make_row("ALMA", 40000)])
+        session.commit()
+
+    # Several batches in the HST backend
+    assert prune_expired_windows(batch_size=2) == 4
+
+    with FacilitySessions["HST"]() as session:
+        assert [row.t_start for row in session.query(ObjObsSAPModel).all()] == [90000]
+
+    with get_db() as session:
+        assert session.query(ObjObsSAPModel).count() == 0
+        assert get_data_version(session) == 1
+
+    # Nothing left to prune, so the version stays the same
+    assert prune_expired_windows(batch_size=2) == 0
+    with get_db() as session:
+        assert get_data_version(session) == 1
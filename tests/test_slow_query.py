@@ -0,0 +1,51 @@
+"""Tests for the slow-query log."""
+
+import pytest
+
+from fastapi_objobssap import slow_query
+from fastapi_objobssap.cancellation import QueryScope
+from fastapi_objobssap.exceptions import QueryTimeoutError
+
+
+@pytest.fixture
+def slow_scope(monkeypatch):
+    """A scope over the slow-query threshold with a recorded statement, and every slow query sampled."""
+    monkeypatch.setattr(slow_query.settings, "SLOW_QUERY_THRESHOLD", 1e-9)
+    monkeypatch.setattr(slow_query.settings, "SLOW_QUERY_EXPLAIN_RATE", 1.0)
+
+    scope = QueryScope()
+    with scope.stage("query"):
+        scope.record_statement("bind", "statement")
+    return scope
+
+
+@pytest.fixture
+def submitted(monkeypatch):
+    """Capture the plan captures submitted to the executor, releasing the capture lock like a finished one."""
+    calls = []
+
+    def submit(func, entry, statements, analyze):  # pylint: disable=unused-argument
+        calls.append(analyze)
+        slow_query.capture_lock.release()
+
+    monkeypatch.setattr(slow_query.explain_executor, "submit", submit)
+    return calls
+
+
+def test_slow_query_is_sampled_with_analyze(slow_scope, submitted):
+    slow_query.record_slow_query({}, slow_scope)
+
+    assert submitted == [True]
+
+
+def test_timed_out_query_is_not_analyzed(slow_scope, submitted):
+    slow_query.record_slow_query({}, slow_scope, QueryTimeoutError("too slow"))
+
+    assert submitted == [False]
+
+
+def test_sample_dropped_while_capture_running(slow_scope, submitted):
+    with slow_query.capture_lock:
+        slow_query.record_slow_query({}, slow_scope)
+
+    assert submitted == []
@@ -0,0 +1,98 @@
+"""Tests for serving queries from memory-mapped snapshots."""
+
+import os
+from contextlib import contextmanager
+
+from fastapi_objobssap import services
+from fastapi_objobssap.config.database import FacilitySessions, get_db
+from fastapi_objobssap.main import app
+from fastapi_objobssap.models import DataVersion
+from fastapi_objobssap.schemas import PositionParameter
+from fastapi_objobssap.services import bump_data_version, upsert_objobssap_rows
+from fastapi_objobssap.snapshot import SnapshotStore, export_snapshot
+from tests.conftest import make_row, parse_votable
+
+
+@contextmanager
+def unavailable_db():
+    """A database that fails when it is opened."""
+    raise AssertionError("The database session was opened")
+    yield  # pylint: disable=unreachable
+
+
+def test_snapshot_query_does_not_open_database(client, tmp_path, monkeypatch):
+    # Facilities without a backend of their own are stored in the default database
+    with get_db() as session:
+        upsert_objobssap_rows(session, [make_row("ALMA", 60001), make_row("ALMA", 60002)])
+        session.commit()
+        export_snapshot(session, str(tmp_path), keep=1)
+
+    monkeypatch.setattr(services, "snapshot_store", SnapshotStore(str(tmp_path)))
+    monkeypatch.setitem(app.dependency_overrides, get_db, unavailable_db)
+
+    response = client.get("/query", params={"POS": "10,10", "TIME": "60000/60010", "FACILITY": "ALMA", "MAXREC": 1})
+
+    table = parse_votable(response).get_first_table().to_table()
+    assert list(table["t_start"]) == [60001]
+    assert parse_votable(response).infos[0].value == "OVERFLOW"
+
+
+def test_fan_out_served_from_snapshot(client, tmp_path, monkeypatch):
+    with get_db() as session:
+        upsert_objobssap_rows(session, [make_row("ALMA", 60003, s_ra=9.9), make_row("ALMA", 60002, s_ra=10.1)])
+        session.commit()
+        export_snapshot(session, str(tmp_path), keep=1)
+
+    with FacilitySessions["HST"]() as session:
+        upsert_objobssap_rows(session, [make_row("HST", 60001)])
+        session.commit()
+
+    monkeypatch.setattr(services, "snapshot_store", SnapshotStore(str(tmp_path)))
+    monkeypatch.setitem(app.dependency_overrides, get_db, unavailable_db)
+
+    response = client.get("/query", params={"POS": "10,10", "TIME": "60000/60010", "MAXREC": 2})
+
+    table = parse_votable(response).get_first_table().to_table()
+    assert [(str(row["facility"]), int(row["t_start"])) for row in table] == [("HST", 60001), ("ALMA", 60002)]
+
+
+def test_new_export_remapped_and_old_mapping_still_readable(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    pos = PositionParameter(ra=10, dec=10)
+
+    with get_db() as session:
+        upsert_objobssap_rows(session, [make_row("ALMA", 60001)])
+        bump_data_version(session)
+        session.commit()
+        first_path = export_snapshot(session, str(tmp_path), keep=1)
+
+    first = store.get()
+    assert first.path == first_path
+
+    with get_db() as session:
+        upsert_objobssap_rows(session, [make_row("ALMA", 60002)])
+        bump_data_version(session)
+        session.commit()
+        second_path = export_snapshot(session, str(tmp_path), keep=1)
+
+    # The first version is pruned, while the mapping already held keeps reading it
+    assert not os.path.exists(first_path)
+    assert store.get().path == second_path
+    assert [row["t_start"] for row in first.query(pos, None, None, None, 10)] == [60001]
+    assert sorted(row["t_start"] for row in store.get().query(pos, None, None, None, 10)) == [60001, 60002]
+
+
+def test_export_kept_when_data_version_goes_backwards(tmp_path):
+    with get_db() as session:
+        for _ in range(3):
+            bump_data_version(session)
+        session.commit()
+        export_snapshot(session, str(tmp_path), keep=1)
+
+        # Like a restore of an older database
+        session.query(DataVersion).delete()
+        session.commit()
+        latest_path = export_snapshot(session, str(tmp_path), keep=1)
+
+    assert os.path.realpath(tmp_path / "current") == latest_path
+    assert SnapshotStore(str(tmp_path)).get().data_version == 0